@@ -0,0 +1,359 @@
+import asyncio
+import ssl
+import time
+from urllib.parse import urljoin, urlsplit
+
+import h11
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+from check_website_status import USER_AGENT, BodyDigest
+
+READ_SIZE = 65536
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+
+
+class ProbeError(Exception):
+    """Raised when a connection fails or is reset mid-probe."""
+
+
+def _ssl_context():
+    context = ssl.create_default_context()
+    context.set_alpn_protocols(["h2", "http/1.1"])
+    return context
+
+
+def cookie_header(cookies, scheme, host, path):
+    """Builds a Cookie header value from vault cookies that apply to a URL."""
+    pairs = []
+    for cookie in cookies:
+        domain = (cookie.get("domain") or host).lstrip(".")
+        if host != domain and not host.endswith("." + domain):
+            continue
+        if not path.startswith(cookie.get("path", "/")):
+            continue
+        if cookie.get("secure") and scheme != "https":
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+
+class _H2Connection:
+    """One HTTP/2 connection carrying many concurrent probe streams."""
+
+    protocol = "h2"
+
+    def __init__(self, reader, writer, authority):
+        self.reader = reader
+        self.writer = writer
+        self.authority = authority
+        self.conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=True))
+        self.streams = {}
+        self.closed = False
+        self.conn.initiate_connection()
+        self.writer.write(self.conn.data_to_send())
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    async def request(self, path, headers):
+        if self.closed:
+            raise ProbeError("HTTP/2 connection closed.")
+        stream_id = self.conn.get_next_available_stream_id()
+        stream = {
+            "future": asyncio.get_running_loop().create_future(),
+            "status": None,
+            "ttfb": None,
+            "headers": {},
+            "body": 0,
+            "hash": None,
+        }
+        self.streams[stream_id] = stream
+        self.conn.send_headers(stream_id, [
+            (":method", "GET"),
+            (":scheme", "https"),
+            (":authority", self.authority),
+            (":path", path),
+        ] + headers, end_stream=True)
+        self.writer.write(self.conn.data_to_send())
+        await self.writer.drain()
+        try:
+            await stream["future"]
+        except asyncio.CancelledError:
+            # a probe deadline fired; tell the server to stop sending
+            if not self.closed:
+                self.conn.reset_stream(stream_id)
+                self.writer.write(self.conn.data_to_send())
+            raise
+        finally:
+            self.streams.pop(stream_id, None)
+        digest = stream["hash"] or BodyDigest()
+        return stream["status"], stream["ttfb"], stream["headers"], stream["body"], digest.hexdigest()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                data = await self.reader.read(READ_SIZE)
+                if not data:
+                    raise ProbeError("HTTP/2 connection closed by server.")
+                for event in self.conn.receive_data(data):
+                    self._handle(event)
+                self.writer.write(self.conn.data_to_send())
+        except Exception as e:
+            self._fail_all(e if isinstance(e, ProbeError) else ProbeError(str(e)))
+
+    def _handle(self, event):
+        stream = self.streams.get(getattr(event, "stream_id", None))
+        if isinstance(event, h2.events.ResponseReceived) and stream:
+            stream["ttfb"] = time.perf_counter()
+            stream["headers"] = {name.decode().lower(): value.decode() for name, value in event.headers}
+            stream["status"] = int(stream["headers"][":status"])
+            stream["hash"] = BodyDigest(stream["headers"].get("content-type"))
+        elif isinstance(event, h2.events.DataReceived):
+            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if stream:
+                stream["body"] += len(event.data)
+                if stream["hash"]:
+                    stream["hash"].update(event.data)
+        elif isinstance(event, h2.events.StreamEnded) and stream:
+            if not stream["future"].done():
+                stream["future"].set_result(None)
+        elif isinstance(event, h2.events.StreamReset) and stream:
+            if not stream["future"].done():
+                stream["future"].set_exception(ProbeError(f"Stream reset ({event.error_code})."))
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            raise ProbeError(f"HTTP/2 connection terminated ({event.error_code}).")
+
+    def _fail_all(self, error):
+        self.closed = True
+        for stream in self.streams.values():
+            if not stream["future"].done():
+                stream["future"].set_exception(error)
+        self.writer.close()
+
+    def close(self):
+        self.closed = True
+        self._reader_task.cancel()
+        self.writer.close()
+
+
+class _H11Connection:
+    """One HTTP/1.1 keep-alive connection, one request at a time."""
+
+    protocol = "http/1.1"
+
+    def __init__(self, reader, writer, authority):
+        self.reader = reader
+        self.writer = writer
+        self.authority = authority
+        self.conn = h11.Connection(our_role=h11.CLIENT)
+        self.closed = False
+
+    async def request(self, path, headers):
+        request = h11.Request(method="GET", target=path, headers=[("Host", self.authority)] + headers)
+        self.writer.write(self.conn.send(request) + self.conn.send(h11.EndOfMessage()))
+        await self.writer.drain()
+        status, ttfb, response_headers, body, digest = None, None, {}, 0, BodyDigest()
+        try:
+            while True:
+                event = self.conn.next_event()
+                if event is h11.NEED_DATA:
+                    data = await self.reader.read(READ_SIZE)
+                    self.conn.receive_data(data)
+                    continue
+                if isinstance(event, h11.Response):
+                    status, ttfb = event.status_code, time.perf_counter()
+                    response_headers = {name.decode().lower(): value.decode() for name, value in event.headers}
+                    digest = BodyDigest(response_headers.get("content-type"))
+                elif isinstance(event, h11.Data):
+                    body += len(event.data)
+                    digest.update(event.data)
+                elif isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+                    break
+        except BaseException:
+            # a half-read response leaves the connection unusable
+            self.close()
+            raise
+        if self.conn.our_state is h11.DONE and self.conn.their_state is h11.DONE:
+            self.conn.start_next_cycle()
+        else:
+            self.close()
+        return status, ttfb, response_headers, body, digest.hexdigest()
+
+    def close(self):
+        self.closed = True
+        self.writer.close()
+
+
+class _Origin:
+    """Connections to one scheme://host:port, capped at max_in_flight requests."""
+
+    def __init__(self, scheme, host, port, max_in_flight):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.authority = host if port in (80, 443) else f"{host}:{port}"
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.handshake = asyncio.Lock()
+        self.protocol = None
+        self.shared = None
+        self.idle = []
+
+    async def _open(self):
+        if self.scheme == "https":
+            reader, writer = await asyncio.open_connection(self.host, self.port, ssl=_ssl_context())
+            negotiated = writer.get_extra_info("ssl_object").selected_alpn_protocol()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            negotiated = None
+        if negotiated == "h2":
+            return _H2Connection(reader, writer, self.authority)
+        return _H11Connection(reader, writer, self.authority)
+
+    async def acquire(self):
+        # the first connection decides whether the origin speaks h2
+        async with self.handshake:
+            if self.shared and not self.shared.closed:
+                return self.shared
+            if self.protocol is None or self.protocol == "h2":
+                connection = await self._open()
+                self.protocol = connection.protocol
+                if connection.protocol == "h2":
+                    self.shared = connection
+                return connection
+        while self.idle:
+            connection = self.idle.pop()
+            # the server may have closed a keep-alive connection while it sat idle between sweeps
+            if not connection.closed and not connection.reader.at_eof():
+                return connection
+            connection.close()
+        return await self._open()
+
+    def release(self, connection):
+        if connection.protocol == "http/1.1" and not connection.closed:
+            self.idle.append(connection)
+
+    def close(self):
+        if self.shared:
+            self.shared.close()
+        for connection in self.idle:
+            connection.close()
+
+
+class AsyncProber:
+    """Probes many endpoints concurrently, multiplexing over HTTP/2 where offered.
+
+    Every origin gets one shared HTTP/2 connection (or a small pool of
+    HTTP/1.1 keep-alive connections when h2 is not negotiated), at most
+    max_per_host requests in flight, and each probe its own deadline.
+    Like StatusChecker, redirects are followed for public endpoints but not
+    for authenticated ones, where a redirect to login is the failure.
+    """
+
+    def __init__(self, max_per_host=6, timeout=10, cookies=(), cache=None):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.cookies = list(cookies)
+        self.cache = cache
+        self._origins = {}
+
+    def _origin(self, parts):
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        if key not in self._origins:
+            self._origins[key] = _Origin(parts.scheme, parts.hostname, port, self.max_per_host)
+        return self._origins[key]
+
+    def _headers(self, endpoint, parts, path, conditional):
+        headers = [("user-agent", USER_AGENT), ("accept", "*/*")]
+        headers += [(name.lower(), value) for name, value in endpoint.get("headers", {}).items()]
+        headers += [(name.lower(), value) for name, value in conditional.items()]
+        if endpoint.get("auth") and self.cookies:
+            cookie = cookie_header(self.cookies, parts.scheme, parts.hostname, path)
+            if cookie:
+                headers.append(("cookie", cookie))
+        return headers
+
+    async def probe(self, endpoint):
+        """Probes one endpoint within its deadline; never raises."""
+        conditional = self.cache.conditional_headers(endpoint["url"]) if self.cache else {}
+        result = {"name": endpoint["name"], "url": endpoint["url"], "timestamp": time.time()}
+        started = time.perf_counter()
+
+        async def request(url):
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            origin = self._origin(parts)
+            async with origin.slots:
+                connection = await origin.acquire()
+                try:
+                    result["protocol"] = connection.protocol
+                    return await connection.request(path, self._headers(endpoint, parts, path, conditional))
+                finally:
+                    origin.release(connection)
+
+        async def run():
+            url = endpoint["url"]
+            for _ in range(MAX_REDIRECTS + 1):
+                response = await request(url)
+                status, headers = response[0], response[2]
+                # authenticated endpoints redirect to login when the session is gone, so don't follow
+                if endpoint.get("auth") or status not in REDIRECT_STATUSES or "location" not in headers:
+                    return response
+                url = urljoin(url, headers["location"])
+            raise ProbeError(f"More than {MAX_REDIRECTS} redirects.")
+
+        try:
+            status, ttfb, headers, body, digest = await asyncio.wait_for(run(), endpoint.get("timeout", self.timeout))
+        except (asyncio.TimeoutError, OSError, ProbeError, h11.ProtocolError, h2.exceptions.ProtocolError) as e:
+            result.update(status=None, ok=False, error=str(e) or type(e).__name__,
+                          total_ms=(time.perf_counter() - started) * 1000)
+            return result
+        if self.cache:
+            result["change"] = self.cache.record(endpoint["url"], status, headers, digest)
+        result.update(
+            status=status,
+            ok=status in endpoint.get("expect", [200]) or (status == 304 and bool(conditional)),
+            ttfb_ms=(ttfb - started) * 1000,
+            total_ms=(time.perf_counter() - started) * 1000,
+            bytes=body,
+        )
+        return result
+
+    async def stream(self, endpoints):
+        """Yields probe results in completion order."""
+        for finished in asyncio.as_completed([self.probe(endpoint) for endpoint in endpoints]):
+            yield await finished
+
+    def close(self):
+        for origin in self._origins.values():
+            origin.close()
+        self._origins = {}
+
+
+def sweep(endpoints, cookies=(), cache=None, on_result=None, interval=0, **options):
+    """Runs concurrent sweeps and returns the last one's results, calling on_result as each arrives.
+
+    With an interval, sweeps repeat every interval seconds on one event loop
+    and prober, so connections stay open from one sweep to the next.
+    """
+    async def run():
+        prober = AsyncProber(cookies=cookies, cache=cache, **options)
+        try:
+            while True:
+                results = []
+                async for result in prober.stream(endpoints):
+                    if on_result:
+                        on_result(result)
+                    results.append(result)
+                if cache:
+                    cache.save()
+                if not interval:
+                    return results
+                await asyncio.sleep(interval)
+        finally:
+            prober.close()
+
+    return asyncio.run(run())
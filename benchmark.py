@@ -0,0 +1,261 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from browser_pool import process_tree_cpu_s
+from command_profiler import add_command_hook, remove_command_hook
+from dom_waits import wait_for_visible
+from form_fill import fill_fields, type_keys
+from interception import RequestInterceptor
+from mock_portal import MockPortal
+from step_plan import APPEALS_FORM_PLAN, compile_plan, load_plan, run_program
+
+# the fixed pause the original locate_and_click took before every click
+LEGACY_SLEEP = 2
+
+# two-sided 95% Student t quantiles by degrees of freedom; 1.96 beyond the table
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+# the plan's intercept step; every strategy ends when this request is failed
+SUBMIT_URL = "*new-message*"
+
+FIELDS = {
+    "txtEmail-appealGreivance": "example@example.com",
+    "txtAddDetail-appealGreivance": "This is additional information about my grievance or appeal.",
+}
+
+
+class Strategy:
+    """One combination of the ways the flow can wait, click, fill and render.
+
+    waits is "sleep" (WebDriverWait plus the legacy fixed sleep), "polling"
+    (WebDriverWait at 0.5 s) or "event" (dom_waits observer); clicks is
+    "native" or "js"; fills is "per_char" or "batched". plan=True runs the
+    compiled appeals step plan instead, which fixes waits, clicks and fills.
+    """
+
+    def __init__(self, waits="event", clicks="native", fills="batched", headless=True, plan=False):
+        self.waits = waits
+        self.clicks = clicks
+        self.fills = fills
+        self.headless = headless
+        self.plan = plan
+
+    @property
+    def name(self):
+        window = "headless" if self.headless else "headful"
+        if self.plan:
+            return f"plan/{window}"
+        return f"{self.waits}/{self.clicks}/{self.fills}/{window}"
+
+
+def default_strategies(headful=False):
+    """The legacy script's strategies, today's defaults, and each axis varied alone from the defaults."""
+    strategies = [
+        Strategy("sleep", "js", "per_char"),
+        Strategy(),
+        Strategy(waits="polling"),
+        Strategy(clicks="js"),
+        Strategy(fills="per_char"),
+        Strategy(plan=True),
+    ]
+    if headful:
+        strategies += [Strategy(headless=False), Strategy(plan=True, headless=False)]
+    return strategies
+
+
+def matrix_strategies(headful=False):
+    windows = (True, False) if headful else (True,)
+    strategies = [Strategy(waits, clicks, fills, headless)
+                  for waits, clicks, fills, headless in
+                  itertools.product(("sleep", "polling", "event"), ("native", "js"), ("per_char", "batched"), windows)]
+    return strategies + [Strategy(plan=True, headless=headless) for headless in windows]
+
+
+def make_driver(strategy):
+    options = webdriver.ChromeOptions()
+    if strategy.headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1280,900")
+    return webdriver.Chrome(options=options)
+
+
+def _wait(driver, strategy, element_id, timeout=10):
+    locator = (By.ID, element_id)
+    if strategy.waits == "event":
+        return wait_for_visible(driver, locator, timeout)
+    element = WebDriverWait(driver, timeout, poll_frequency=0.5).until(EC.element_to_be_clickable(locator))
+    if strategy.waits == "sleep":
+        time.sleep(LEGACY_SLEEP)
+    return element
+
+
+def _click(driver, strategy, element_id):
+    element = _wait(driver, strategy, element_id)
+    if strategy.clicks == "js":
+        driver.execute_script("arguments[0].click();", element)
+    else:
+        element.click()
+
+
+def _fill(driver, strategy, type_delay):
+    if strategy.fills == "batched":
+        _wait(driver, strategy, next(iter(FIELDS)))
+        fill_fields(driver, {(By.ID, element_id): text for element_id, text in FIELDS.items()})
+        return
+    for element_id, text in FIELDS.items():
+        type_keys(_wait(driver, strategy, element_id), text, delay=type_delay)
+
+
+def run_flow(driver, portal, strategy, type_delay=0.1, timeout=10):
+    """Runs the appeals flow once against the mock portal; returns True if the submission was intercepted.
+
+    Every strategy ends at the same point: the new-message request is failed
+    by interception, as in the real check, so nothing reaches the portal.
+    """
+    driver.get(portal.url())
+    submitted = len(portal.submissions)
+    interceptor = RequestInterceptor.for_driver(driver)
+    try:
+        if strategy.plan:
+            ok = run_program(driver, compile_plan(load_plan(APPEALS_FORM_PLAN)), interceptor, measure=False)
+        else:
+            intercepted = interceptor.intercept(SUBMIT_URL)
+            interceptor.start()
+            for element_id in ("tcp-nav-messages-hdr-responsive", "btnComposeMessage",
+                               "ddlNewMsgCat_button", "ddlNewMsgCat_option-14",
+                               "ddlNewMsgCatSub_button", "ddlNewMsgCatSub_option-0",
+                               "rbtnAppealType-appealGreivance-1"):
+                _click(driver, strategy, element_id)
+            _fill(driver, strategy, type_delay)
+            _click(driver, strategy, "mcv2-griev-appeal-submit")
+            _click(driver, strategy, "btnSubmitMsg")
+            try:
+                intercepted.result(timeout)
+                ok = True
+            except FutureTimeout:
+                ok = False
+    finally:
+        interceptor.stop()
+    return ok and len(portal.submissions) == submitted
+
+
+def measure(driver, portal, strategy, type_delay=0.1):
+    """Runs the flow once and returns its wall time, WebDriver command count and CPU time."""
+    commands = []
+    add_command_hook(driver, commands.append)
+    browser_pid = driver.service.process.pid
+    browser_cpu = process_tree_cpu_s(browser_pid)
+    script_cpu = time.process_time()
+    started = time.perf_counter()
+    try:
+        ok = run_flow(driver, portal, strategy, type_delay)
+    finally:
+        wall_s = time.perf_counter() - started
+        script_cpu = time.process_time() - script_cpu
+        browser_cpu = process_tree_cpu_s(browser_pid) - browser_cpu
+        remove_command_hook(driver, commands.append)
+    return {"ok": ok, "wall_s": wall_s, "commands": len(commands),
+            "script_cpu_s": script_cpu, "browser_cpu_s": browser_cpu}
+
+
+def summarize(values):
+    """Mean and 95% confidence half-width of a sample."""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return {"mean": mean, "ci": None}
+    t = T_95[len(values) - 2] if len(values) - 2 < len(T_95) else 1.96
+    return {"mean": mean, "ci": t * statistics.stdev(values) / math.sqrt(len(values))}
+
+
+def benchmark(strategies, runs=5, warmup=1, type_delay=0.1, portal_options=None):
+    """Runs every strategy runs times on its own browser; returns {name: summary}."""
+    results = {}
+    with MockPortal(**(portal_options or {})) as portal:
+        for strategy in strategies:
+            driver = make_driver(strategy)
+            try:
+                for _ in range(warmup):
+                    measure(driver, portal, strategy, type_delay)
+                samples = [measure(driver, portal, strategy, type_delay) for _ in range(runs)]
+            finally:
+                driver.quit()
+            results[strategy.name] = {
+                "runs": runs,
+                "failures": sum(1 for sample in samples if not sample["ok"]),
+                **{metric: summarize([sample[metric] for sample in samples])
+                   for metric in ("wall_s", "commands", "script_cpu_s", "browser_cpu_s")},
+            }
+            print_result(strategy.name, results[strategy.name])
+    return results
+
+
+def _format(summary, digits):
+    ci = f" ±{summary['ci']:.{digits}f}" if summary["ci"] is not None else ""
+    return f"{summary['mean']:.{digits}f}{ci}"
+
+
+def print_result(name, result):
+    failures = f"  {result['failures']}/{result['runs']} failed" if result["failures"] else ""
+    print(f"{name:<36} wall {_format(result['wall_s'], 2):>14} s  commands {_format(result['commands'], 0):>9}  "
+          f"cpu script {_format(result['script_cpu_s'], 2):>12} s  browser {_format(result['browser_cpu_s'], 2):>12} s"
+          f"{failures}")
+
+
+def regressions(results, baseline, tolerance=0.1):
+    """Strategies whose mean wall time grew by more than tolerance and beyond both confidence intervals."""
+    slower = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        now, then = result["wall_s"], baseline[name]["wall_s"]
+        if now["mean"] <= then["mean"] * (1 + tolerance):
+            continue
+        if now["mean"] - (now["ci"] or 0) > then["mean"] + (then["ci"] or 0):
+            slower.append(name)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the appeals flow strategies against the mock portal.")
+    parser.add_argument("--runs", type=int, default=5, help="measured runs per strategy")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs per strategy")
+    parser.add_argument("--matrix", action="store_true", help="run every combination of strategies")
+    parser.add_argument("--headful", action="store_true", help="also run strategies with a visible window")
+    parser.add_argument("--type-delay", type=float, default=0.1, help="seconds between keys for per_char fills")
+    parser.add_argument("--latency-ms", type=float, default=50, help="mock portal response delay")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="mock portal response delay variation")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed wall time growth over the baseline")
+    args = parser.parse_args()
+
+    strategies = matrix_strategies(args.headful) if args.matrix else default_strategies(args.headful)
+    results = benchmark(strategies, args.runs, args.warmup, args.type_delay,
+                        {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "seed": 0})
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as file:
+            slower = regressions(results, json.load(file), args.tolerance)
+        if slower:
+            print(f"Slower than baseline: {', '.join(slower)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+from browser_pool import PORTAL_URL
+from check_form_submission import check_form_submission
+from devtools import DevToolsError, DevToolsSession
+from interception import RequestInterceptor
+from network_tracker import NetworkTracker
+from step_plan import APPEALS_FORM_PLAN
+
+# DOM nodes cannot be returned by value over CDP; scripts shared with the
+# WebDriver path may return them, so they come back as None here.
+TO_VALUE_JS = """
+function (value) {
+    return value === undefined ? null : JSON.parse(JSON.stringify(value, function (key, item) {
+        return item instanceof Node ? null : item;
+    }));
+}
+"""
+
+
+class ContextPage:
+    """A page target driven directly over its own DevTools session.
+
+    Implements the subset of the WebDriver API the check flow uses
+    (scripts, navigation, CDP commands), so step plans can run in several
+    targets at once instead of queueing behind one chromedriver session.
+    Like chromedriver, scripts wait for a navigation of the main frame that
+    is in progress (e.g. started by a click) to finish loading, rather than
+    running in the document being unloaded.
+    """
+
+    def __init__(self, session, load_timeout=30):
+        self.session = session
+        self.load_timeout = load_timeout
+        self.script_timeout = 30
+        self._loaded = threading.Event()
+        self._navigated = threading.Event()
+        self._navigated.set()
+        self.session.on("Page.loadEventFired", lambda params: self._loaded.set())
+        self.session.send("Page.enable")
+        self.frame_id = self.session.send("Page.getFrameTree")["frameTree"]["frame"]["id"]
+        # the renderer reports a requested navigation before answering the script that caused it
+        self.session.on("Page.frameRequestedNavigation", self._on_navigation_started)
+        self.session.on("Page.frameStartedLoading", self._on_navigation_started)
+        self.session.on("Page.frameStoppedLoading", self._on_navigation_finished)
+        self.session.on("Page.navigatedWithinDocument", self._on_navigation_finished)
+
+    @property
+    def current_url(self):
+        return self.execute_script("return location.href;")
+
+    def set_script_timeout(self, seconds):
+        self.script_timeout = seconds
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.session.send(cmd, cmd_args)
+
+    def execute_script(self, script, *args):
+        expression = (
+            f"({TO_VALUE_JS})((function () {{ {script} \n}}).apply(window, {json.dumps(list(args))}))"
+        )
+        return self._evaluate(expression, await_promise=False, timeout=self.script_timeout)
+
+    def execute_async_script(self, script, *args):
+        expression = (
+            "new Promise(function (resolve) {"
+            f" (function () {{ {script} \n}}).apply(window, {json.dumps(list(args))}.concat([resolve]));"
+            f" }}).then({TO_VALUE_JS})"
+        )
+        return self._evaluate(expression, await_promise=True, timeout=self.script_timeout)
+
+    def get(self, url):
+        self._loaded.clear()
+        self.session.send("Page.navigate", {"url": url})
+        self._wait_for_load()
+
+    def refresh(self):
+        self._loaded.clear()
+        self.session.send("Page.reload", {})
+        self._wait_for_load()
+
+    def quit(self):
+        """Pages are owned by their BrowserContext; closing happens there."""
+
+    def _on_navigation_started(self, params):
+        if params["frameId"] == self.frame_id and params.get("disposition", "currentTab") == "currentTab":
+            self._navigated.clear()
+
+    def _on_navigation_finished(self, params):
+        if params["frameId"] == self.frame_id:
+            self._navigated.set()
+
+    def _wait_for_load(self):
+        if not self._loaded.wait(self.load_timeout):
+            raise TimeoutException(f"Page did not load within {self.load_timeout}s.")
+
+    def _wait_for_navigation(self):
+        if not self._navigated.wait(self.load_timeout):
+            raise TimeoutException(f"Navigation did not finish within {self.load_timeout}s.")
+
+    def _evaluate(self, expression, await_promise, timeout):
+        self._wait_for_navigation()
+        try:
+            response = self.session.send("Runtime.evaluate", {
+                "expression": expression,
+                "awaitPromise": await_promise,
+                "returnByValue": True,
+            }, timeout=timeout)
+        except DevToolsError as e:
+            raise JavascriptException(str(e))
+        except FutureTimeoutError:
+            raise TimeoutException(f"Script did not finish within {timeout}s.")
+        if "exceptionDetails" in response:
+            details = response["exceptionDetails"]
+            raise JavascriptException(details.get("exception", {}).get("description", details.get("text")))
+        return response["result"].get("value")
+
+
+class BrowserContext:
+    """An isolated cookie jar and storage partition inside a shared Chrome process."""
+
+    def __init__(self, driver, browser_session, url="about:blank"):
+        self.driver = driver
+        self.browser_session = browser_session
+        self.id = browser_session.send("Target.createBrowserContext", {"disposeOnDetach": True})["browserContextId"]
+        self.target_id = browser_session.send("Target.createTarget", {
+            "url": url,
+            "browserContextId": self.id,
+        })["targetId"]
+        self.session = DevToolsSession.for_driver(driver, self.target_id)
+        self.page = ContextPage(self.session)
+
+    def set_cookies(self, cookies):
+        """Installs cookies into this context's jar only."""
+        self.browser_session.send("Storage.setCookies", {"cookies": cookies, "browserContextId": self.id})
+
+    def get_cookies(self):
+        return self.browser_session.send("Storage.getCookies", {"browserContextId": self.id})["cookies"]
+
+    def interceptor(self):
+        """Returns a RequestInterceptor scoped to this context's page."""
+        return RequestInterceptor(self.session)
+
+    def network_tracker(self):
+        """Returns a NetworkTracker scoped to this context's page."""
+        return NetworkTracker(self.session)
+
+    def close(self):
+        self.session.close()
+        try:
+            self.browser_session.send("Target.disposeBrowserContext", {"browserContextId": self.id})
+        except DevToolsError:
+            pass
+
+
+@contextmanager
+def isolated_context(driver, browser_session=None, url="about:blank"):
+    """Creates a BrowserContext in the driver's browser and disposes of it afterwards."""
+    owns_session = browser_session is None
+    if owns_session:
+        browser_session = DevToolsSession.for_browser(driver)
+    context = BrowserContext(driver, browser_session, url)
+    try:
+        yield context
+    finally:
+        context.close()
+        if owns_session:
+            browser_session.close()
+
+
+def run_in_contexts(driver, flows, max_workers=None):
+    """Runs flow(context) callables concurrently, each in its own browser context.
+
+    Returns the flows' results in order.
+    """
+    with DevToolsSession.for_browser(driver) as browser_session:
+        def run(flow):
+            with isolated_context(driver, browser_session) as context:
+                return flow(context)
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(flows)) as executor:
+            return list(executor.map(run, flows))
+
+
+def form_check_flow(cookies, url=PORTAL_URL, plan_path=APPEALS_FORM_PLAN):
+    """Returns a flow that runs the form check in a context logged in with cookies."""
+    def flow(context):
+        context.set_cookies(cookies)
+        context.page.get(url)
+        return check_form_submission(context.page, plan_path, quit_driver=False, interceptor=context.interceptor(),
+                                     tracker=context.network_tracker())
+
+    return flow
@@ -0,0 +1,226 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import undetected_chromedriver as uc
+
+PORTAL_URL = "https://membersecure.anthem.com/member/find-care"
+
+
+def default_factory():
+    """Starts a new undetected Chrome instance."""
+    return uc.Chrome()
+
+
+def cookie_login(vault=None, name="default", url=PORTAL_URL, blocking="functional-only"):
+    """Returns a login callback that restores a saved session and opens the portal.
+
+    blocking names a resource_blocking profile, or None to load every resource.
+    """
+    from check_form_submission import load_session
+    from page_metrics import install_page_metrics
+    from resource_blocking import install_resource_blocking
+
+    def login(driver):
+        if blocking:
+            install_resource_blocking(driver, blocking)
+        install_page_metrics(driver)
+        load_session(driver, url, vault, name)
+
+    return login
+
+
+def _process_tree(root_pid):
+    """Yields the /proc stat fields (from field 3 on) of a process and its descendants (Linux only)."""
+    children = {}
+    stats = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                fields = file.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        pid, ppid = int(entry), int(fields[1])
+        children.setdefault(ppid, []).append(pid)
+        stats[pid] = fields
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid in stats:
+            yield stats[pid]
+        stack.extend(children.get(pid, []))
+
+
+def _process_tree_rss_mb(root_pid):
+    """Sums resident memory of a process and its descendants."""
+    # field 24 of stat is rss in pages; fields here start at field 3
+    total = sum(int(fields[21]) for fields in _process_tree(root_pid)) * os.sysconf("SC_PAGE_SIZE")
+    return total / (1024 * 1024)
+
+
+def process_tree_cpu_s(root_pid):
+    """Sums user and system CPU seconds used so far by a process and its live descendants."""
+    # fields 14 and 15 of stat are utime and stime in clock ticks
+    ticks = sum(int(fields[11]) + int(fields[12]) for fields in _process_tree(root_pid))
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def browser_memory_mb(driver):
+    """Returns the browser's memory use in MB, falling back to the JS heap off Linux."""
+    # uc.Chrome launches Chrome itself, outside chromedriver's process tree, and records its pid
+    pid = getattr(driver, "browser_pid", None)
+    if pid is None:
+        process = getattr(getattr(driver, "service", None), "process", None)
+        pid = process.pid if process is not None else None
+    if pid is not None and os.path.isdir("/proc"):
+        return _process_tree_rss_mb(pid)
+    metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    heap = next((m["value"] for m in metrics if m["name"] == "JSHeapTotalSize"), 0)
+    return heap / (1024 * 1024)
+
+
+class BrowserPool:
+    """Keeps warm, logged-in browsers and leases them out for checks.
+
+    Browsers are reset between leases (extra tabs closed, blank page,
+    cookies re-applied) and recycled once they have served max_runs checks
+    or grown past max_memory_mb.
+    """
+
+    def __init__(self, size=2, factory=default_factory, login=None, max_runs=20, max_memory_mb=1500):
+        self.size = size
+        self.factory = factory
+        self.login = login
+        self.max_runs = max_runs
+        self.max_memory_mb = max_memory_mb
+        self._idle = queue.Queue()
+        self._runs = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def warm(self):
+        """Starts browsers until the pool holds size of them."""
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return self
+                self._created += 1
+            self._idle.put(self._start())
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Yields a ready browser and returns it to the pool when the check ends."""
+        driver = self._acquire(timeout)
+        healthy = False
+        try:
+            yield driver
+            healthy = True
+        finally:
+            self._release(driver, healthy)
+
+    def close(self):
+        """Quits every idle browser; leased browsers are quit when returned."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(driver)
+
+    def __enter__(self):
+        return self.warm()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start(self):
+        """Starts a browser in a slot the caller already counted in _created; frees the slot if that fails."""
+        started = time.monotonic()
+        driver = None
+        try:
+            driver = self.factory()
+            if self.login:
+                self.login(driver)
+        except BaseException:
+            if driver is not None:
+                self._discard(driver)
+            with self._lock:
+                self._created -= 1
+            raise
+        self._runs[id(driver)] = 0
+        print(f"Browser warmed in {time.monotonic() - started:.1f}s.")
+        return driver
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self._created < self.size
+            if grow:
+                self._created += 1
+        if grow:
+            return self._start()
+        return self._idle.get(timeout=timeout)
+
+    def _release(self, driver, healthy):
+        self._runs[id(driver)] = self._runs.get(id(driver), 0) + 1
+        if self._closed or not healthy or self._should_recycle(driver):
+            self._replace(driver)
+            return
+        try:
+            self.reset(driver)
+        except Exception as e:
+            print(f"Browser reset failed, recycling: {e}")
+            self._replace(driver)
+            return
+        self._idle.put(driver)
+
+    def _replace(self, driver):
+        self._discard(driver)
+        with self._lock:
+            self._created -= 1
+        if not self._closed:
+            # a failed replacement must not hide the check's own error; the next lease retries the slot
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Starting a replacement browser failed: {e}")
+
+    def _should_recycle(self, driver):
+        if self._runs[id(driver)] >= self.max_runs:
+            print("Recycling browser after reaching its run limit.")
+            return True
+        try:
+            memory = browser_memory_mb(driver)
+        except Exception:
+            return True
+        if memory > self.max_memory_mb:
+            print(f"Recycling browser using {memory:.0f} MB.")
+            return True
+        return False
+
+    def reset(self, driver):
+        """Closes extra tabs, blanks the page and re-applies the login state."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+        if self.login:
+            self.login(driver)
+
+    def _discard(self, driver):
+        self._runs.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -1,12 +1,9 @@
 import json
-import threading
 import requests
-import time
-import pickle
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
@@ -16,13 +13,33 @@ import os
 
 import undetected_chromedriver as uc
 
+from command_profiler import CommandProfiler
+from cookie_selector import CookieSelector
+from cookie_vault import CookieVault
+from devtools import DevToolsError
+from dom_waits import wait_for_clickable, wait_for_dom_quiet, wait_for_element
+from form_fill import fill_field, fill_fields, type_keys
+from instrumentation import RunTimeline, span
+from interception import RequestInterceptor
+from latency_stats import LatencyStats, stats_file
+from page_metrics import collect_page_metrics, install_page_metrics, print_page_metrics
+from page_state import check_precondition, has_error, probe_page_state
+from resource_blocking import install_resource_blocking, resource_blocker
+from result_log import ResultLog
+from route_cache import RouteCache
+from session_snapshot import SessionSnapshots
+from step_plan import APPEALS_FORM_PLAN, compile_plan, load_plan, run_program
+
 # load environment variables from .env file
 load_dotenv()
 
-def fill_input_field(driver, locator_type, locator_value, text):
-    """Reusable function to locate an input field and send text."""
-    input_field = driver.find_element(locator_type, locator_value)
-    input_field.send_keys(text)
+# cookies pickled by earlier versions; imported into the vault on first load
+LEGACY_COOKIE_FILE = "cookies.pkl"
+
+def fill_input_field(driver, locator_type, locator_value, text, mode="batched"):
+    """Reusable function to fill an input field; per-keystroke typing is opt-in via mode."""
+    with span("fill", locator=locator_value, mode=mode):
+        fill_field(driver, locator_type, locator_value, text, mode=mode)
 
 def click_element(driver, locator_type, locator_value):
     """Reusable function to locate and click an element."""
@@ -34,12 +51,10 @@ def click_element(driver, locator_type, locator_value):
 
 def simulate_human_typing(input_element, text, delay=0.1):
     """Type text into an input element key-by-key with a delay."""
-    for char in text:
-        input_element.send_keys(char)
-        time.sleep(delay)
+    type_keys(input_element, text, delay)
 
-def login_and_navigate():
-    """Performs login for user while simulating human typing"""
+def login_and_navigate(human_typing=False):
+    """Performs login for user, optionally simulating human typing"""
     driver = webdriver.Chrome()
 
     username = os.getenv("USERNAME")
@@ -48,31 +63,31 @@ def login_and_navigate():
     try:
         # Open login page
         print("Opening login page...")
+        install_page_metrics(driver)
         driver.get("https://www.anthem.com/ca/login/")
+        print_page_metrics(collect_page_metrics(driver, "login"))
 
         # Fill in credentials
-        print("Filling in username...")
-        username_input = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "txtUsername"))
-        )
-        simulate_human_typing(username_input, username, delay=0.2)
-
-        print("Filling in password...")
-        password_input = driver.find_element(By.ID, "txtPassword")
-        simulate_human_typing(password_input, password, delay=0.2)
+        username_input = wait_for_element(driver, (By.ID, "txtUsername"), timeout=10)
+        if human_typing:
+            print("Filling in username...")
+            simulate_human_typing(username_input, username, delay=0.2)
+
+            print("Filling in password...")
+            password_input = driver.find_element(By.ID, "txtPassword")
+            simulate_human_typing(password_input, password, delay=0.2)
+        else:
+            print("Filling in credentials...")
+            fill_fields(driver, {(By.ID, "txtUsername"): username, (By.ID, "txtPassword"): password})
 
         # Click login button
         print("Clicking login button...")
-        login_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "btnLogin"))
-        )
+        login_button = wait_for_clickable(driver, (By.ID, "btnLogin"), timeout=10)
         login_button.click()
 
         # Wait for the next page to load
         print("Waiting for dashboard...")
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "dashboardElement"))
-        )
+        wait_for_element(driver, (By.ID, "dashboardElement"), timeout=10)
         print("Login successful and page loaded!")
 
     except TimeoutException as e:
@@ -85,148 +100,188 @@ def login_and_navigate():
         print("Quitting driver...")
         driver.quit()
 
-def save_cookies(driver, filepath):
-    """Saves cookies from Chrome profile user session."""
-    # store session details in a pickled file
-    cookies = driver.get_cookies()
-    with open(filepath, "wb") as file:
-        pickle.dump(cookies, file)
-        print("Cookies saved!")
+# cookies that carry the portal login; names are matched as prefixes, as before
+ESSENTIAL_COOKIES = CookieSelector(allow=[
+    ("prefix", "SMSESSION"),
+    ("prefix", "mod_auth_openidc_session"),
+    ("glob", "mod_auth_openidc_state_*"),
+    ("prefix", "pfrememberme"),
+    ("prefix", "lsid"),
+    ("prefix", "target"),
+])
 
 def filter_cookies(cookies):
-    essential_cookie_names = {
-        "SMSESSION",
-        "mod_auth_openidc_session",
-        "mod_auth_openidc_state_*",
-        "pfrememberme",
-        "lsid", 
-        "target"
-    }
-    filtered_cookies = [
-        cookie for cookie in cookies if any(cookie["name"].startswith(name) for name in essential_cookie_names)
-    ]
-
-    return filtered_cookies
-
-def load_cookies(driver, filepath):
-    """Loads cookies from a file to a browser sessions."""
-    with open(filepath, "rb") as file:
-        cookies = pickle.load(file)
-        for cookie in filter_cookies(cookies):
-            driver.add_cookie(cookie)
-        print("Cookies loaded!")
-
-def locate_and_click(driver, element_id, timeout=10):
+    """Keeps the login cookies; ESSENTIAL_COOKIES.stats counts what was kept and why."""
+    return ESSENTIAL_COOKIES.select(cookies)
+
+def load_cookies(driver, vault=None, name="default"):
+    """Loads cookies from the vault into a browser session, before or after navigating."""
+    vault = vault or CookieVault()
+    if not vault.exists(name) and os.path.exists(LEGACY_COOKIE_FILE):
+        vault.import_pickle(LEGACY_COOKIE_FILE, name, select=filter_cookies)
+    with span("cookie_load", jar=name):
+        count = vault.restore(driver, name, select=filter_cookies)
+    print(f"{count} cookies loaded!")
+
+def save_session(driver, vault=None, name="default"):
+    """Saves cookies, Web Storage and IndexedDB of the logged-in page as one snapshot."""
+    entry = SessionSnapshots(vault).save(driver, name, select=filter_cookies)
+    print(f"Session saved! ({entry['count']} cookies, {entry['bytes'] / 1024:.0f} KB)")
+
+def load_session(driver, url, vault=None, name="default"):
+    """Restores the saved session and opens url; falls back to cookies alone when there is no snapshot."""
+    snapshots = SessionSnapshots(vault)
+    if snapshots.exists(name):
+        snapshots.open(driver, url, name, select=filter_cookies)
+        print("Session restored!")
+        return
+    load_cookies(driver, vault, name)
+    driver.get(url)
+
+def locate_and_click(driver, element_id, timeout=10, stable_ms=300):
     """Locates and clicks the button specified."""
-    if is_error_present(driver):
+    with span("click", element_id=element_id):
+        return _locate_and_click(driver, element_id, timeout, stable_ms)
+
+def _locate_and_click(driver, element_id, timeout, stable_ms):
+    ready, state = check_precondition(driver, element_id)
+    if has_error(state):
         print("Error detected before attempting to click.")
         return False
     try:
-        # Locate the element
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.ID, element_id))
-        )
+        # Locate the element (skip the wait when the probe already found it)
+        if ready:
+            element = state["element"]
+        else:
+            element = wait_for_element(driver, (By.ID, element_id), timeout)
         print(f"Element with ID '{element_id}' located!")
 
-        # Optional: Wait for stabilization (if necessary)
-        time.sleep(2)
+        # Wait for stabilization, but no longer than the old fixed 2 s sleep
+        try:
+            wait_for_dom_quiet(driver, quiet_ms=stable_ms, timeout=2)
+        except TimeoutException:
+            pass
 
         # Click the element using JavaScript
         driver.execute_script("arguments[0].click();", element)
         print(f"Clicked the element with ID '{element_id}' using JavaScript!")
+        return True
     except Exception as e:
         print(f"Failed to click the element with ID '{element_id}': {e}")
-
-def is_error_present(driver, timeout=20):
-    """Wait for the error message to appear and check if it is displayed."""
-    try:
-        # Wait until the error container is present and visible
-        error_element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "ant-error-container"))
-        )
-        # Optional: Check the text content if needed
-        if "Sorry, looks like something isn't working." in error_element.text:
-            return True
-    except:
         return False
-    
-def check_form_submission(driver):
-    """Function to automate form submission and intercept the form request using CDP."""
-
-    intercepted_requests = []  # To store intercepted requests
-
-    # Enable Fetch domain and set request interception patterns
-    driver.execute_cdp_cmd("Fetch.enable", {"patterns": [{"urlPattern": "*new-message*", "requestStage": "Request"}]})
-
-    def handle_request():
-        while True:
-            try:
-                events = driver.execute_cdp_cmd("Fetch.takePausedRequest", {})
-                if events and "new-message" in events["request"]["url"]:
-                    print(f"Intercepted request to: {events['request']['url']}")
-                    intercepted_requests.append(events)
-                    driver.execute_cdp_cmd("Fetch.failRequest", {"requestId": events["requestId"], "errorReason": "BlockedByClient"})
-                    break
-            except Exception:
-                pass  # Ignore if no requests are paused
-
-    threading.Thread(target=handle_request, daemon=True).start()
-
 
-    try: 
-        # Refresh page to apply cookies
-        driver.refresh()
-        print("Logged in using saved cookies!")
-
-        # Navigate through page to submit appeals form
-        if not locate_and_click(driver, "tcp-nav-messages-hdr-responsive"):
-            print("Failed during navigation. Exiting.")
+def is_error_present(driver):
+    """Check if the error message is displayed, without waiting for it to appear."""
+    return has_error(probe_page_state(driver))
+    
+def check_form_submission(driver, plan_path=APPEALS_FORM_PLAN, quit_driver=True, interceptor=None, refresh=False,
+                          timeline=None, profiler=None, result_log=None, stats=None, tracker=None, routes=None,
+                          deep_link=False):
+    """Function to automate form submission and intercept the form request using CDP.
+
+    Pass quit_driver=False when the driver is leased from a BrowserPool, and
+    an interceptor (and a NetworkTracker for plans with network waits) when
+    the page is not the driver's current tab. Cookies
+    restored before navigating need no refresh; pass refresh=True otherwise.
+    With a RouteCache in routes, the views the plan reaches are recorded, and
+    deep_link=True jumps straight to the last one, clicking through only if
+    the deep link fails.
+    Every step is timed on timeline; without one, a new timeline is
+    appended to result_log (the default ResultLog if None) when the run
+    ends, and recorded in stats (a LatencyStats) if given. WebDriver commands are
+    recorded by profiler and summarised at the end of the run.
+    """
+
+    export = timeline is None
+    if export:
+        timeline = RunTimeline(os.path.splitext(os.path.basename(plan_path))[0])
+    profiler = (profiler or CommandProfiler()).install(driver)
+
+    blocker = resource_blocker(driver)
+    if blocker is not None:
+        blocker.reset_counts()
+
+    # The navigation and the new-message interception are described by the step plan
+    program = compile_plan(load_plan(plan_path))
+    if interceptor is None:
+        interceptor = RequestInterceptor.for_driver(driver)
+
+    with timeline.activate(driver):
+        try: 
+            if refresh:
+                # Refresh page to apply cookies
+                with span("refresh"):
+                    driver.refresh()
+                print("Logged in using saved cookies!")
+
+            timeline.ok = run_program(driver, program, interceptor, tracker=tracker, routes=routes, deep_link=deep_link)
+            if timeline.ok:
+                print("Form submission was intercepted successfully.")
+                return True
+
+            print("Form submission check failed.")
             return False
-        if not locate_and_click(driver, "btnComposeMessage"):
-            print("Failed during navigation. Exiting.")
+
+        except TimeoutException as e:
+            timeline.ok = False
+            print(f"Timeout occurred: {e}")
             return False
-        locate_and_click(driver, "ddlNewMsgCat_button")
-        locate_and_click(driver, "ddlNewMsgCat_option-14")
-        locate_and_click(driver, "ddlNewMsgCatSub_button")
-        locate_and_click(driver, "ddlNewMsgCatSub_option-0")
-        locate_and_click(driver, "rbtnAppealType-appealGreivance-1")
-        fill_input_field(driver, By.ID, "txtEmail-appealGreivance", "example@example.com")
-        fill_input_field(driver, By.ID, "txtAddDetail-appealGreivance", 
-                         "This is additional information about my grievance or appeal.")
-        
-        # Click the submit button
-        locate_and_click(driver, "mcv2-griev-appeal-submit")
-        locate_and_click(driver, "btnSubmitMsg")
-
-        if intercepted_requests:
-            print("Form submission was intercepted successfully.")
-            return True
-        
-        print("No form submission request detected.")
-        return False
 
-    except TimeoutException as e:
-        print(f"Timeout occurred: {e}")
-        return False
+        except (WebDriverException, DevToolsError) as e:
+            # a failed batch script or DevTools call fails the check, not the caller
+            timeline.ok = False
+            print(f"Browser error occurred: {e}")
+            return False
 
-    finally:
-        driver.execute_cdp_cmd("Fetch.disable", {})
-        driver.quit()
+        finally:
+            interceptor.stop()
+            if blocker is not None:
+                blocking = blocker.report()
+                timeline.add("blocking", blocking)
+                print(f"Blocked {blocking['blocked']} requests (~{blocking['blocked_bytes_est'] / 1024:.0f} KB), "
+                      f"loaded {blocking['loaded']} ({blocking['loaded_bytes'] / 1024:.0f} KB).")
+            profiler.uninstall()
+            profiler.report()
+            if quit_driver:
+                driver.quit()
+            if export:
+                if result_log is None:
+                    with ResultLog() as result_log:
+                        timeline.export(result_log)
+                else:
+                    timeline.export(result_log)
+                if stats is not None:
+                    stats.ingest_run(timeline.to_record())
 
 def main():
 
-    # Log in and save cookies to file
-    driver = uc.Chrome()
-    driver.get("https://membersecure.anthem.com/member/find-care")
-    input("Log in manually and press Enter...")
-    save_cookies(driver, "cookies.pkl")
+    vault = CookieVault()
+    if not vault.exists() and os.path.exists(LEGACY_COOKIE_FILE):
+        vault.import_pickle(LEGACY_COOKIE_FILE, select=filter_cookies)
 
-    # Load cookies from file and add to driver
-    load_cookies(driver, "cookies.pkl") 
-    driver.refresh()
+    driver = uc.Chrome()
+    install_resource_blocking(driver)
+    install_page_metrics(driver)
+    flow = os.path.splitext(os.path.basename(APPEALS_FORM_PLAN))[0]
+    if vault.is_expired():
+        # Log in and save cookies to the vault
+        driver.get("https://membersecure.anthem.com/member/find-care")
+        input("Log in manually and press Enter...")
+        save_session(driver, vault)
+        timeline = RunTimeline(flow)
+    else:
+        # Restore the saved session before the first navigation; the restore is timed as part of the run
+        timeline = RunTimeline(flow)
+        with timeline.activate(driver):
+            load_session(driver, "https://membersecure.anthem.com/member/find-care", vault)
 
     print("Cookies loaded. Browser will remain open.")
-    check_form_submission(driver)
+    stats = LatencyStats.load(stats_file())
+    check_form_submission(driver, timeline=timeline, routes=RouteCache())
+    with ResultLog() as result_log:
+        timeline.export(result_log)
+    stats.ingest_run(timeline.to_record())
+    stats.save(stats_file())
     input("Press Enter to quit...")
 
 if __name__ == "__main__":
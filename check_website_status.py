@@ -0,0 +1,257 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cookie_vault import CookieVault, atomic_write
+
+ENDPOINTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endpoints.json")
+PROBE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "probe_cache.json")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+
+
+def load_endpoints(filepath=ENDPOINTS_FILE):
+    """Loads the list of endpoints to probe: [{"name", "url", "auth", "expect"}]."""
+    with open(filepath, "r") as file:
+        return json.load(file)
+
+
+def make_session(pool_size=10):
+    """Creates a keep-alive session whose connection pool is reused across sweeps."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def add_vault_cookies(session, vault, name="default"):
+    """Copies a cookie vault jar into a requests session's cookie jar."""
+    for cookie in vault.load(name):
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain"),
+            path=cookie.get("path", "/"),
+            secure=cookie.get("secure", False),
+            expires=int(cookie["expires"]) if cookie.get("expires") else None,
+        )
+
+
+# per-request noise in portal HTML: scripts (inline config, nonces), comments, hidden form
+# tokens, CSRF meta tags and nonce attributes
+VOLATILE_HTML = re.compile(
+    rb"<script\b.*?</script\s*>|<noscript\b.*?</noscript\s*>|<!--.*?-->"
+    rb"|<input\b[^>]*\btype\s*=\s*[\"']?hidden\b[^>]*>"
+    rb"|<meta\b[^>]*(?:csrf|token)[^>]*>"
+    rb"|\snonce\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s>]+)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+class BodyDigest:
+    """Hashes a response body for change detection.
+
+    JSON and other bodies are hashed as they stream in. HTML is buffered and
+    hashed with scripts, hidden inputs, CSRF tokens and nonces stripped and
+    whitespace collapsed, since those differ on every request.
+    """
+
+    def __init__(self, content_type=None):
+        self.html = "html" in (content_type or "").lower()
+        self._hash = hashlib.sha256()
+        self._chunks = []
+
+    def update(self, data):
+        if self.html:
+            self._chunks.append(data)
+        else:
+            self._hash.update(data)
+
+    def hexdigest(self):
+        if self.html:
+            body = VOLATILE_HTML.sub(b" ", b"".join(self._chunks))
+            return hashlib.sha256(b" ".join(body.split())).hexdigest()
+        return self._hash.hexdigest()
+
+
+def body_digest(body, content_type=None):
+    digest = BodyDigest(content_type)
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class ProbeCache:
+    """Remembers validators and a content hash per URL for conditional probes.
+
+    Probes send If-None-Match / If-Modified-Since from the last response; a
+    304 means healthy and unchanged. A 200 is unchanged if it carries the
+    stored ETag or Last-Modified or its BodyDigest matches the stored one;
+    otherwise it is reported as "changed", which is the signal to run the
+    full browser check.
+    """
+
+    def __init__(self, filepath=PROBE_CACHE_FILE):
+        self.filepath = filepath
+        try:
+            with open(filepath, "r") as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url, status, headers, digest):
+        """Updates the entry for url and returns "new", "changed" or "unchanged"."""
+        entry = self.entries.get(url)
+        now = time.time()
+        if status == 304 and entry:
+            entry["checked_at"] = now
+            return "unchanged"
+        if status != 200:
+            return None
+        etag, last_modified = headers.get("etag"), headers.get("last-modified")
+        if entry is None:
+            change = "new"
+        elif (etag and etag == entry["etag"]) or (last_modified and last_modified == entry["last_modified"]) \
+                or entry["hash"] == digest:
+            change = "unchanged"
+        else:
+            change = "changed"
+        self.entries[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": digest,
+            "checked_at": now,
+            "changed_at": now if change != "unchanged" else entry["changed_at"],
+        }
+        return change
+
+    def save(self):
+        atomic_write(self.filepath, json.dumps(self.entries, indent=2).encode())
+
+
+class StatusChecker:
+    """Probes portal endpoints over pooled HTTP connections, no browser needed."""
+
+    def __init__(self, endpoints, vault=None, jar="default", timeout=10, cache=None):
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.cache = cache
+        self.session = make_session()
+        self.auth_session = None
+        if any(endpoint.get("auth") for endpoint in endpoints):
+            vault = vault or CookieVault()
+            self.auth_session = make_session()
+            if vault.exists(jar):
+                add_vault_cookies(self.auth_session, vault, jar)
+            else:
+                print("No saved session; authenticated endpoints will report as logged out.")
+
+    def probe(self, endpoint):
+        """Requests one endpoint and records status, TTFB and total latency."""
+        session = self.auth_session if endpoint.get("auth") else self.session
+        expect = endpoint.get("expect", [200])
+        headers = self.cache.conditional_headers(endpoint["url"]) if self.cache else {}
+        result = {"name": endpoint["name"], "url": endpoint["url"], "timestamp": time.time()}
+        started = time.perf_counter()
+        try:
+            # authenticated endpoints redirect to login when the session is gone, so don't follow
+            with session.get(endpoint["url"], timeout=self.timeout, stream=True, headers=headers,
+                             allow_redirects=not endpoint.get("auth")) as response:
+                # elapsed stops when the response headers have been parsed
+                result["ttfb_ms"] = response.elapsed.total_seconds() * 1000
+                body = response.content
+                result["bytes"] = len(body)
+                result["status"] = response.status_code
+                if self.cache:
+                    result["change"] = self.cache.record(endpoint["url"], response.status_code, response.headers,
+                                                         body_digest(body, response.headers.get("content-type")))
+        except requests.RequestException as e:
+            result["total_ms"] = (time.perf_counter() - started) * 1000
+            result["status"] = None
+            result["ok"] = False
+            result["error"] = str(e)
+            return result
+        result["total_ms"] = (time.perf_counter() - started) * 1000
+        result["ok"] = result["status"] in expect or (result["status"] == 304 and bool(headers))
+        return result
+
+    def sweep(self):
+        """Probes every endpoint once."""
+        results = [self.probe(endpoint) for endpoint in self.endpoints]
+        if self.cache:
+            self.cache.save()
+        return results
+
+    def close(self):
+        self.session.close()
+        if self.auth_session:
+            self.auth_session.close()
+
+
+def print_results(results):
+    for result in results:
+        if result["status"] is None:
+            print(f"{result['name']:<16} DOWN  {result['total_ms']:7.0f} ms  {result['error']}")
+        else:
+            state = "OK" if result["ok"] else "FAIL"
+            change = f"  {result['change']}" if result.get("change") else ""
+            print(f"{result['name']:<16} {state:<5} {result['status']}  "
+                  f"ttfb {result['ttfb_ms']:6.0f} ms  total {result['total_ms']:6.0f} ms{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe portal endpoints over HTTP.")
+    parser.add_argument("--endpoints", default=ENDPOINTS_FILE, help="JSON list of endpoints to probe")
+    parser.add_argument("--interval", type=float, default=0, help="seconds between sweeps; 0 runs once")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="probe all endpoints at once over multiplexed HTTP/2 connections")
+    parser.add_argument("--no-cache", action="store_true", help="always download full responses")
+    args = parser.parse_args()
+
+    endpoints = load_endpoints(args.endpoints)
+    cache = None if args.no_cache else ProbeCache()
+    if args.concurrent:
+        import async_prober
+        vault = CookieVault()
+        cookies = vault.load() if vault.exists() else []
+        try:
+            async_prober.sweep(endpoints, cookies=cookies, cache=cache, interval=args.interval,
+                               on_result=lambda result: print_results([result]))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    checker = StatusChecker(endpoints, cache=cache)
+    try:
+        while True:
+            print_results(checker.sweep())
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        checker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import time
+from collections import deque
+
+
+def _size(value):
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def add_command_hook(driver, hook):
+    """Calls hook(record) after every command the driver sends to chromedriver.
+
+    The first hook wraps driver.command_executor.execute (RemoteConnection),
+    so records carry the command name, payload and response sizes in bytes
+    of JSON and the HTTP round-trip latency.
+    """
+    executor = getattr(driver, "command_executor", None)
+    if executor is None:
+        return False
+    hooks = executor.__dict__.get("_command_hooks")
+    if hooks is None:
+        hooks = executor._command_hooks = []
+        execute = executor.execute
+
+        def profiled_execute(command, params):
+            started = time.perf_counter()
+            error = None
+            response = None
+            try:
+                response = execute(command, params)
+                return response
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                record = {
+                    "command": command,
+                    "payload_bytes": _size(params),
+                    "latency_ms": (time.perf_counter() - started) * 1000,
+                    "response_bytes": _size(response),
+                    "error": error,
+                }
+                for hook_fn in list(hooks):
+                    hook_fn(record)
+
+        executor.execute = profiled_execute
+    hooks.append(hook)
+    return True
+
+
+def remove_command_hook(driver, hook):
+    executor = getattr(driver, "command_executor", None)
+    hooks = executor.__dict__.get("_command_hooks") if executor is not None else None
+    if hooks and hook in hooks:
+        hooks.remove(hook)
+
+
+class CommandProfiler:
+    """Keeps the last capacity chromedriver commands in a ring buffer."""
+
+    def __init__(self, capacity=2000):
+        self.records = deque(maxlen=capacity)
+        self._drivers = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def install(self, driver):
+        if add_command_hook(driver, self):
+            self._drivers.append(driver)
+        return self
+
+    def uninstall(self):
+        for driver in self._drivers:
+            remove_command_hook(driver, self)
+        self._drivers = []
+
+    def summary(self, top=10, by="total_ms"):
+        """Returns per-command totals sorted by total_ms or count, largest first."""
+        totals = {}
+        for record in self.records:
+            entry = totals.setdefault(record["command"], {
+                "command": record["command"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "payload_bytes": 0,
+                "response_bytes": 0,
+            })
+            entry["count"] += 1
+            entry["total_ms"] += record["latency_ms"]
+            entry["max_ms"] = max(entry["max_ms"], record["latency_ms"])
+            entry["payload_bytes"] += record["payload_bytes"]
+            entry["response_bytes"] += record["response_bytes"]
+        return sorted(totals.values(), key=lambda entry: entry[by], reverse=True)[:top]
+
+    def report(self, top=5):
+        """Prints the top commands by total time and by count."""
+        records = list(self.records)
+        total_ms = sum(record["latency_ms"] for record in records)
+        print(f"WebDriver commands: {len(records)} in {total_ms:.0f} ms")
+        for by, title in (("total_ms", "by total time"), ("count", "by count")):
+            print(f"Top commands {title}:")
+            print(f"  {'command':<28}{'count':>7}{'total ms':>11}{'max ms':>9}{'sent B':>9}{'recv B':>10}")
+            for entry in self.summary(top, by):
+                print(f"  {entry['command']:<28}{entry['count']:>7}{entry['total_ms']:>11.0f}{entry['max_ms']:>9.0f}"
+                      f"{entry['payload_bytes']:>9}{entry['response_bytes']:>10}")
@@ -0,0 +1,106 @@
+import fnmatch
+import re
+from collections import Counter
+
+RULE_KINDS = ("exact", "prefix", "glob", "domain", "path")
+
+
+def _name_pattern(kind, value):
+    if kind == "exact":
+        return re.escape(value) + r"\Z"
+    if kind == "prefix":
+        return re.escape(value)
+    # fnmatch.translate anchors with \Z already
+    return fnmatch.translate(value)
+
+
+def _compile(rules, kinds):
+    """Compiles rules of the given kinds into one regex with a named group per rule."""
+    parts = []
+    for index, (kind, value) in enumerate(rules):
+        if kind not in kinds:
+            continue
+        if kind == "domain":
+            pattern = r"(?:.*\.)?" + re.escape(value.lstrip(".")) + r"\Z"
+        elif kind == "path":
+            pattern = re.escape(value.rstrip("/")) + r"(?:/|\Z)"
+        else:
+            pattern = _name_pattern(kind, value)
+        parts.append(f"(?P<r{index}>{pattern})")
+    return re.compile("|".join(parts)) if parts else None
+
+
+class CookieSelector:
+    """Selects cookies with allow and deny rules compiled into single regexes.
+
+    Rules are (kind, value) pairs where kind is exact, prefix or glob (on
+    the cookie name), domain (the domain or any subdomain) or path (the
+    path or anything below it). A cookie is selected when, for each field
+    that has allow rules, one of them matches, and no deny rule matches.
+    Each field costs one regex match however many rules it has.
+    """
+
+    def __init__(self, allow=(), deny=()):
+        for kind, _ in list(allow) + list(deny):
+            if kind not in RULE_KINDS:
+                raise ValueError(f"Unknown cookie rule kind: {kind}")
+        self.allow = list(allow)
+        self.deny = list(deny)
+        self._allow = {
+            "name": _compile(self.allow, ("exact", "prefix", "glob")),
+            "domain": _compile(self.allow, ("domain",)),
+            "path": _compile(self.allow, ("path",)),
+        }
+        self._deny = {
+            "name": _compile(self.deny, ("exact", "prefix", "glob")),
+            "domain": _compile(self.deny, ("domain",)),
+            "path": _compile(self.deny, ("path",)),
+        }
+        self.stats = Counter()
+
+    def select(self, cookies):
+        """Returns the selected cookies in one pass, updating self.stats."""
+        selected = []
+        stats = self.stats
+        for cookie in cookies:
+            stats["seen"] += 1
+            fields = {
+                "name": cookie["name"],
+                "domain": (cookie.get("domain") or "").lstrip("."),
+                "path": cookie.get("path") or "/",
+            }
+            denied = None
+            for field, regex in self._deny.items():
+                match = regex.match(fields[field]) if regex else None
+                if match:
+                    denied = match.lastgroup
+                    break
+            if denied:
+                stats["denied"] += 1
+                stats[f"deny:{self._describe(self.deny, denied)}"] += 1
+                continue
+
+            hits = []
+            for field, regex in self._allow.items():
+                if regex is None:
+                    continue
+                match = regex.match(fields[field])
+                if not match:
+                    break
+                hits.append(match.lastgroup)
+            else:
+                stats["selected"] += 1
+                for hit in hits:
+                    stats[f"allow:{self._describe(self.allow, hit)}"] += 1
+                selected.append(cookie)
+                continue
+            stats["not_allowed"] += 1
+        return selected
+
+    def __call__(self, cookies):
+        return self.select(cookies)
+
+    @staticmethod
+    def _describe(rules, group):
+        kind, value = rules[int(group[1:])]
+        return f"{kind}:{value}"
@@ -0,0 +1,126 @@
+import json
+import os
+import pickle
+import tempfile
+import time
+import zlib
+
+VAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cookie_vault")
+INDEX_FILE = "index.json"
+
+# Session cookies carry no expiry; assume the portal drops them after this long.
+DEFAULT_SESSION_TTL = 30 * 60
+
+
+def atomic_write(path, data):
+    """Writes bytes to path via a fsynced temp file and rename, so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def to_cdp_cookie(cookie):
+    """Converts a WebDriver cookie dict into a Network.CookieParam."""
+    param = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain"),
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    expires = cookie.get("expiry", cookie.get("expires"))
+    if expires is not None and expires > 0:
+        param["expires"] = expires
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        param["sameSite"] = cookie["sameSite"]
+    return {key: value for key, value in param.items() if value is not None}
+
+
+def session_expiry(cookies, saved_at, session_ttl=DEFAULT_SESSION_TTL):
+    """Earliest moment any of the cookies expires, counting session cookies as saved_at + session_ttl."""
+    expiries = [c["expires"] if c.get("expires") else saved_at + session_ttl for c in cookies]
+    return min(expiries) if expiries else saved_at
+
+
+class CookieVault:
+    """Stores named cookie jars as compressed JSON with an expiry index.
+
+    Each jar is a zlib-compressed JSON list of Network.CookieParam dicts.
+    index.json records when each jar was saved and when its earliest
+    cookie expires, so callers can tell a session is stale without
+    launching a browser or decompressing the jar.
+    """
+
+    def __init__(self, directory=VAULT_DIR, session_ttl=DEFAULT_SESSION_TTL):
+        self.directory = directory
+        self.session_ttl = session_ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _jar_path(self, name):
+        return os.path.join(self.directory, f"{name}.jar")
+
+    def index(self):
+        """Returns {name: {"saved_at", "expires_at", "count"}} for every stored jar."""
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, cookies, name="default", select=None):
+        """Saves cookies (WebDriver or CDP dicts) under name; select(cookies) picks the ones that count for expiry."""
+        cookies = [to_cdp_cookie(c) for c in cookies]
+        saved_at = time.time()
+        payload = json.dumps(cookies, separators=(",", ":")).encode()
+        atomic_write(self._jar_path(name), zlib.compress(payload, 9))
+
+        tracked = select(cookies) if select else cookies
+        index = self.index()
+        index[name] = {
+            "saved_at": saved_at,
+            "expires_at": session_expiry(tracked, saved_at, self.session_ttl),
+            "count": len(cookies),
+        }
+        atomic_write(os.path.join(self.directory, INDEX_FILE), json.dumps(index, indent=2).encode())
+        return index[name]
+
+    def load(self, name="default"):
+        """Returns the stored cookies of a jar as Network.CookieParam dicts."""
+        with open(self._jar_path(name), "rb") as file:
+            return json.loads(zlib.decompress(file.read()))
+
+    def exists(self, name="default"):
+        return name in self.index() and os.path.exists(self._jar_path(name))
+
+    def expires_at(self, name="default"):
+        """Epoch seconds at which the jar's session is expected to expire, or None if unknown."""
+        entry = self.index().get(name)
+        return entry["expires_at"] if entry else None
+
+    def is_expired(self, name="default", margin=60, now=None):
+        """True if the jar is missing or expires within margin seconds."""
+        expires_at = self.expires_at(name)
+        return expires_at is None or expires_at - margin <= (now or time.time())
+
+    def restore(self, driver, name="default", select=None):
+        """Installs a jar into the browser with one Network.setCookies call; works before any navigation."""
+        cookies = self.load(name)
+        if select:
+            cookies = select(cookies)
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        return len(cookies)
+
+    def import_pickle(self, filepath, name="default", select=None):
+        """Imports a jar pickled by the old save_cookies()."""
+        with open(filepath, "rb") as file:
+            return self.save(pickle.load(file), name, select)
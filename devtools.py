@@ -0,0 +1,168 @@
+import itertools
+import json
+import threading
+from concurrent.futures import Future
+
+import requests
+import websocket
+
+
+class DevToolsError(Exception):
+    """Raised when a DevTools command returns an error or the connection drops."""
+
+
+def debugger_address(driver):
+    """Returns the host:port of the DevTools endpoint a Chrome driver is attached to."""
+    options = driver.capabilities.get("goog:chromeOptions", {})
+    address = options.get("debuggerAddress")
+    if not address:
+        raise DevToolsError("Driver does not expose a debuggerAddress.")
+    return address
+
+
+def list_targets(address):
+    """Lists the DevTools targets (tabs, workers, ...) of the browser at address."""
+    return requests.get(f"http://{address}/json/list", timeout=5).json()
+
+
+def browser_websocket_url(address):
+    """Returns the browser-level DevTools websocket URL."""
+    return requests.get(f"http://{address}/json/version", timeout=5).json()["webSocketDebuggerUrl"]
+
+
+def page_websocket_url(driver, target_id=None):
+    """Returns the DevTools websocket URL of a page target (the driver's current tab by default)."""
+    address = debugger_address(driver)
+    if target_id is None:
+        # chromedriver window handles are the DevTools target ids
+        target_id = driver.current_window_handle.replace("CDwindow-", "")
+    for target in list_targets(address):
+        if target["id"].upper() == target_id.upper():
+            return target["webSocketDebuggerUrl"]
+    raise DevToolsError(f"No DevTools target with id '{target_id}'.")
+
+
+class DevToolsSession:
+    """A direct DevTools websocket connection with a blocking reader thread.
+
+    Commands are sent over the socket and resolved through futures; events
+    are dispatched to listeners as they arrive. The reader thread blocks on
+    the socket, so an idle session costs no CPU.
+    """
+
+    def __init__(self, ws_url, timeout=10):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self._ws = websocket.create_connection(ws_url, suppress_origin=True, enable_multithread=True)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    @classmethod
+    def for_driver(cls, driver, target_id=None, timeout=10):
+        """Opens a session on the driver's current page (or the given target)."""
+        return cls(page_websocket_url(driver, target_id), timeout=timeout)
+
+    @classmethod
+    def for_browser(cls, driver, timeout=10):
+        """Opens a browser-level session (Target.*, Browser.* domains)."""
+        return cls(browser_websocket_url(debugger_address(driver)), timeout=timeout)
+
+    def send_async(self, method, params=None, session_id=None):
+        """Sends a command and returns a Future for its result."""
+        if self._closed.is_set():
+            raise DevToolsError("DevTools session is closed.")
+        message_id = next(self._ids)
+        future = Future()
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        with self._lock:
+            self._pending[message_id] = future
+        self._ws.send(json.dumps(message))
+        return future
+
+    def send(self, method, params=None, session_id=None, timeout=None):
+        """Sends a command and blocks until its result arrives."""
+        future = self.send_async(method, params, session_id)
+        return future.result(timeout=timeout or self.timeout)
+
+    def on(self, event, callback):
+        """Registers callback(params) for a DevTools event such as 'Fetch.requestPaused'.
+
+        Callbacks run on the reader thread, so they must use send_async()
+        rather than send() to issue follow-up commands.
+        """
+        with self._lock:
+            self._listeners.setdefault(event, []).append(callback)
+
+    def off(self, event, callback):
+        """Removes a listener registered with on()."""
+        with self._lock:
+            callbacks = self._listeners.get(event, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def close(self):
+        """Closes the websocket and fails any command still waiting for a reply."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        self._fail_pending(DevToolsError("DevTools session closed."))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_loop(self):
+        while not self._closed.is_set():
+            try:
+                raw = self._ws.recv()
+            except Exception as e:
+                if not self._closed.is_set():
+                    self._closed.set()
+                    self._fail_pending(DevToolsError(f"DevTools connection lost: {e}"))
+                return
+            if not raw:
+                continue
+            self._dispatch(json.loads(raw))
+
+    def _dispatch(self, message):
+        if "id" in message:
+            with self._lock:
+                future = self._pending.pop(message["id"], None)
+            if future is None:
+                return
+            if "error" in message:
+                future.set_exception(DevToolsError(message["error"].get("message", str(message["error"]))))
+            else:
+                future.set_result(message.get("result", {}))
+            return
+
+        with self._lock:
+            callbacks = list(self._listeners.get(message.get("method"), []))
+        params = message.get("params", {})
+        if "sessionId" in message:
+            params = dict(params, sessionId=message["sessionId"])
+        for callback in callbacks:
+            try:
+                callback(params)
+            except Exception as e:
+                print(f"DevTools listener for {message.get('method')} failed: {e}")
+
+    def _fail_pending(self, error):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,149 @@
+import weakref
+
+from selenium.common.exceptions import TimeoutException
+
+from page_state import locator_target
+
+# Installs one MutationObserver per document. Waiters register a check that
+# is re-evaluated on every mutation batch, so a wait ends as soon as its
+# condition holds instead of on the next polling tick. Visibility can also
+# change without a mutation (transitions, stylesheets, layout), so checks
+# re-run on transition/animation ends and on a short tick while anyone waits.
+INSTALL_SCRIPT = """
+(function () {
+    if (window.__domWaits) {
+        return;
+    }
+    const TICK_MS = 100;
+    const waits = {lastMutation: performance.now(), waiters: new Set(), tick: null};
+    waits.find = function (target) {
+        return target.id ? document.getElementById(target.id) : document.querySelector(target.css);
+    };
+    waits.visible = function (element) {
+        if (!element || !element.isConnected) {
+            return false;
+        }
+        const rect = element.getBoundingClientRect();
+        const style = window.getComputedStyle(element);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== "hidden" && style.display !== "none";
+    };
+    waits.clickable = function (element) {
+        return waits.visible(element) && !element.disabled;
+    };
+    waits.settle = function () {
+        for (const waiter of Array.from(waits.waiters)) {
+            waiter.check();
+        }
+    };
+    waits.register = function (check, timeoutMs, done) {
+        const waiter = {};
+        const finish = function (result) {
+            if (waits.waiters.delete(waiter)) {
+                clearTimeout(waiter.timer);
+                if (!waits.waiters.size) {
+                    clearInterval(waits.tick);
+                    waits.tick = null;
+                }
+                done(result);
+            }
+        };
+        waiter.check = function () {
+            const value = check(finish);
+            if (value) {
+                finish({ok: true, value: value === true ? null : value});
+            }
+        };
+        waiter.timer = setTimeout(function () { finish({ok: false}); }, timeoutMs);
+        waits.waiters.add(waiter);
+        if (!waits.tick) {
+            waits.tick = setInterval(waits.settle, TICK_MS);
+        }
+        waiter.check();
+    };
+    new MutationObserver(function () {
+        waits.lastMutation = performance.now();
+        waits.settle();
+    }).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    ["transitionend", "animationend", "load"].forEach(function (type) {
+        document.addEventListener(type, waits.settle, true);
+    });
+    window.__domWaits = waits;
+})();
+"""
+
+WAIT_SCRIPT = INSTALL_SCRIPT + """
+const kind = arguments[0];
+const target = arguments[1];
+const options = arguments[2];
+const done = arguments[arguments.length - 1];
+const waits = window.__domWaits;
+let quietTimer;
+waits.register(function (finish) {
+    if (kind === "present") {
+        return waits.find(target);
+    }
+    if (kind === "visible") {
+        const element = waits.find(target);
+        return waits.visible(element) ? element : null;
+    }
+    if (kind === "clickable") {
+        const element = waits.find(target);
+        return waits.clickable(element) ? element : null;
+    }
+    if (kind === "quiet") {
+        // re-arm a timer on every mutation; it fires once the DOM stays still
+        clearTimeout(quietTimer);
+        const idle = performance.now() - waits.lastMutation;
+        quietTimer = setTimeout(function () {
+            if (performance.now() - waits.lastMutation >= options.quietMs) {
+                finish({ok: true, value: null});
+            }
+        }, Math.max(options.quietMs - idle, 0));
+        return null;
+    }
+    return null;
+}, options.timeoutMs, done);
+"""
+
+
+# the async script timeout last set on each driver
+_script_timeouts = weakref.WeakKeyDictionary()
+
+
+def ensure_script_timeout(driver, seconds):
+    """Raises the driver's async script timeout to at least seconds, skipping redundant calls."""
+    if _script_timeouts.get(driver, 0) < seconds:
+        driver.set_script_timeout(seconds)
+        _script_timeouts[driver] = seconds
+
+
+def _wait(driver, kind, locator, timeout, **options):
+    # execute_async_script needs a script timeout longer than the wait itself
+    ensure_script_timeout(driver, timeout + 5)
+    target = locator_target(*locator) if locator else None
+    options["timeoutMs"] = int(timeout * 1000)
+    result = driver.execute_async_script(WAIT_SCRIPT, kind, target, options)
+    if not result or not result["ok"]:
+        raise TimeoutException(f"Timed out after {timeout}s waiting for {kind} {locator or ''}".rstrip())
+    return result["value"]
+
+
+def wait_for_element(driver, locator, timeout=10):
+    """Waits until an element matching locator, e.g. (By.ID, "btnSubmitMsg"), is in the DOM."""
+    return _wait(driver, "present", locator, timeout)
+
+
+def wait_for_visible(driver, locator, timeout=10):
+    """Waits until an element matching locator is rendered with a non-empty box."""
+    return _wait(driver, "visible", locator, timeout)
+
+
+def wait_for_clickable(driver, locator, timeout=10):
+    """Waits until an element matching locator is visible and not disabled."""
+    return _wait(driver, "clickable", locator, timeout)
+
+
+def wait_for_dom_quiet(driver, quiet_ms=300, timeout=10):
+    """Waits until the DOM has had no mutations for quiet_ms milliseconds."""
+    _wait(driver, "quiet", None, timeout, quietMs=quiet_ms)
+
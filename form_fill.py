@@ -0,0 +1,76 @@
+import time
+
+from selenium.common.exceptions import NoSuchElementException
+
+from page_state import locator_target
+
+# React/Ant Design inputs track the native value setter, so assigning
+# element.value directly is ignored; go through the prototype setter and
+# fire the events the widgets listen for.
+SET_VALUE_JS = """
+function setValue(element, value) {
+    const proto = element instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+        : element instanceof HTMLSelectElement ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+    const setter = Object.getOwnPropertyDescriptor(proto, "value").set;
+    element.focus();
+    setter.call(element, value);
+    element.dispatchEvent(new Event("input", {bubbles: true}));
+    element.dispatchEvent(new Event("change", {bubbles: true}));
+    element.blur();
+}
+"""
+
+FILL_SCRIPT = SET_VALUE_JS + """
+const fields = arguments[0];
+const missing = [];
+for (const field of fields) {
+    const element = field.target.id ? document.getElementById(field.target.id) : document.querySelector(field.target.css);
+    if (!element) {
+        missing.push(field.name);
+        continue;
+    }
+    setValue(element, field.value);
+}
+return missing;
+"""
+
+
+def fill_fields(driver, values):
+    """Fills several fields in one command from a {(By, value): text} mapping."""
+    fields = [
+        {"target": locator_target(*locator), "value": text, "name": locator[1]}
+        for locator, text in values.items()
+    ]
+    missing = driver.execute_script(FILL_SCRIPT, fields)
+    if missing:
+        raise NoSuchElementException(f"Could not fill missing fields: {', '.join(missing)}")
+
+
+def insert_text(driver, element, text):
+    """Types text into an element as a single Input.insertText, firing real input events."""
+    driver.execute_script("arguments[0].focus();", element)
+    driver.execute_cdp_cmd("Input.insertText", {"text": text})
+
+
+def type_keys(element, text, delay=0.1):
+    """Type text into an input element key-by-key with a delay (explicit opt-in)."""
+    for char in text:
+        element.send_keys(char)
+        time.sleep(delay)
+
+
+def fill_field(driver, locator_type, locator_value, text, mode="batched", delay=0.1):
+    """Fills one field; mode is "batched" (script), "insert_text" (CDP), "keys" or "human"."""
+    if mode == "batched":
+        fill_fields(driver, {(locator_type, locator_value): text})
+        return
+    element = driver.find_element(locator_type, locator_value)
+    if mode == "insert_text":
+        insert_text(driver, element, text)
+    elif mode == "keys":
+        element.send_keys(text)
+    elif mode == "human":
+        type_keys(element, text, delay)
+    else:
+        raise ValueError(f"Unknown fill mode: {mode}")
+
@@ -0,0 +1,115 @@
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+
+from command_profiler import add_command_hook, remove_command_hook
+
+_active = contextvars.ContextVar("active_timeline", default=None)
+
+
+class RunTimeline:
+    """Monotonic-clock spans for one check run, with WebDriver command counts per span.
+
+    Spans nest; a command issued inside a nested span is counted in that
+    span and in every span enclosing it.
+    """
+
+    def __init__(self, flow, run_id=None):
+        self.flow = flow
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._open = []
+        self.spans = []
+        self.commands = 0
+        self.command_ms = 0.0
+        self.ok = None
+        self.data = {}
+        self._drivers = []
+
+    def _now_ms(self):
+        return (time.perf_counter() - self._origin) * 1000
+
+    @contextmanager
+    def span(self, name, **tags):
+        """Times a step; errors are recorded on the span and re-raised."""
+        record = {"name": name, "start_ms": self._now_ms(), "commands": 0, "command_ms": 0.0}
+        if tags:
+            record["tags"] = tags
+        self._open.append(record)
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._open.remove(record)
+            record["duration_ms"] = self._now_ms() - record["start_ms"]
+            self.spans.append(record)
+
+    def add(self, key, value):
+        """Appends a value to a list stored with the run record (e.g. "pages")."""
+        self.data.setdefault(key, []).append(value)
+
+    def count_command(self, record):
+        """Command hook: adds one chromedriver round trip to the run and every open span."""
+        self.commands += 1
+        self.command_ms += record["latency_ms"]
+        for span_record in self._open:
+            span_record["commands"] += 1
+            span_record["command_ms"] += record["latency_ms"]
+
+    def attach(self, driver):
+        """Counts every WebDriver command the driver issues while attached."""
+        if add_command_hook(driver, self.count_command):
+            self._drivers.append(driver)
+
+    def detach(self):
+        for driver in self._drivers:
+            remove_command_hook(driver, self.count_command)
+        self._drivers = []
+
+    @contextmanager
+    def activate(self, driver=None):
+        """Makes this the timeline that module-level span() records into."""
+        token = _active.set(self)
+        if driver is not None:
+            self.attach(driver)
+        try:
+            yield self
+        finally:
+            self.detach()
+            _active.reset(token)
+
+    def to_record(self):
+        return {
+            "run_id": self.run_id,
+            "flow": self.flow,
+            "started_at": self.started_at,
+            "duration_ms": self._now_ms(),
+            "ok": self.ok,
+            "commands": self.commands,
+            "command_ms": self.command_ms,
+            "spans": sorted(self.spans, key=lambda record: record["start_ms"]),
+            **self.data,
+        }
+
+    def export(self, result_log):
+        """Appends the run to a ResultLog."""
+        result_log.append(self.to_record())
+
+
+def current_timeline():
+    return _active.get()
+
+
+@contextmanager
+def span(name, **tags):
+    """Records a span on the active timeline; does nothing when none is active."""
+    timeline = _active.get()
+    if timeline is None:
+        yield None
+        return
+    with timeline.span(name, **tags) as record:
+        yield record
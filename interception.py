@@ -0,0 +1,120 @@
+import re
+import threading
+from concurrent.futures import Future
+
+from devtools import DevToolsSession
+
+
+def url_pattern_regex(url_pattern):
+    """Compiles a Fetch urlPattern: '*' is any run, '?' one character, backslash escapes the next one."""
+    parts = []
+    chars = iter(url_pattern)
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char == "*":
+            parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+class RequestInterceptor:
+    """Event-driven request interception over the Fetch domain.
+
+    Subscribes to Fetch.requestPaused on a DevTools session instead of
+    polling chromedriver. Each rule is a URL glob; every paused request
+    matching a rule is failed (or let through) according to the rule for as
+    long as the interceptor runs, and the first one resolves the rule's
+    future. Requests matching no rule continue.
+    """
+
+    def __init__(self, session, request_stage="Request", owns_session=False):
+        self.session = session
+        self.request_stage = request_stage
+        self.owns_session = owns_session
+        self.captured = []
+        self._rules = []
+        self._lock = threading.Lock()
+        self._enabled = False
+
+    @classmethod
+    def for_driver(cls, driver, request_stage="Request"):
+        """Creates an interceptor on a dedicated DevTools session for the driver's page."""
+        return cls(DevToolsSession.for_driver(driver), request_stage=request_stage, owns_session=True)
+
+    def intercept(self, url_pattern, fail=True, error_reason="BlockedByClient"):
+        """Adds a rule and returns a Future resolved with the first matching paused request."""
+        future = Future()
+        with self._lock:
+            self._rules.append({
+                "pattern": url_pattern,
+                "regex": url_pattern_regex(url_pattern),
+                "fail": fail,
+                "error_reason": error_reason,
+                "future": future,
+            })
+        if self._enabled:
+            self._apply_patterns()
+        return future
+
+    def start(self):
+        """Enables Fetch interception for the registered patterns."""
+        self.session.on("Fetch.requestPaused", self._on_request_paused)
+        self._enabled = True
+        self._apply_patterns()
+        return self
+
+    def stop(self):
+        """Disables interception and releases the DevTools session if we opened it."""
+        self.session.off("Fetch.requestPaused", self._on_request_paused)
+        if self._enabled:
+            self._enabled = False
+            try:
+                self.session.send("Fetch.disable")
+            except Exception:
+                pass
+        if self.owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _apply_patterns(self):
+        with self._lock:
+            patterns = [{"urlPattern": rule["pattern"], "requestStage": self.request_stage} for rule in self._rules]
+        # an empty pattern list would pause every request
+        if patterns:
+            self.session.send("Fetch.enable", {"patterns": patterns})
+
+    def _on_request_paused(self, event):
+        url = event["request"]["url"]
+        with self._lock:
+            matching = [r for r in self._rules if r["regex"].fullmatch(url)]
+            # a failing rule wins over one that lets the request through
+            rule = next((r for r in matching if r["fail"]), matching[0] if matching else None)
+            # resolve the oldest rule still waiting, so rules added by a later run on this interceptor fire too
+            pending = next((r for r in matching if not r["future"].done()), None)
+
+        # runs on the DevTools reader thread, so never block on a reply here
+        if rule is None:
+            self.session.send_async("Fetch.continueRequest", {"requestId": event["requestId"]})
+            return
+
+        print(f"Intercepted request to: {url}")
+        self.captured.append(event)
+        if rule["fail"]:
+            self.session.send_async("Fetch.failRequest", {
+                "requestId": event["requestId"],
+                "errorReason": rule["error_reason"],
+            })
+        else:
+            self.session.send_async("Fetch.continueRequest", {"requestId": event["requestId"]})
+        # a retry or double click is failed too, but only the first match resolves a future
+        if pending is not None:
+            pending["future"].set_result(event)
@@ -0,0 +1,272 @@
+import argparse
+import glob
+import json
+import math
+import os
+import socket
+import time
+
+from cookie_vault import atomic_write
+from result_log import RESULTS_DIR
+
+# one file per process, merged on load, so runners and schedulers on one or several hosts can share a
+# directory without overwriting each other's samples
+STATS_PATTERN = "stats-*.json"
+SLOT_SECONDS = 300
+RETENTION = 24 * 3600
+
+
+def stats_file(directory=RESULTS_DIR, role="runner"):
+    return os.path.join(directory, f"stats-{socket.gethostname()}-{role}-{os.getpid()}.json")
+
+
+class LatencyHistogram:
+    """HDR-style histogram over log-spaced buckets with bounded relative error.
+
+    Bucket i holds values in (gamma^(i-1), gamma^i], so any quantile is
+    reported within relative_error of the true value however many samples
+    were recorded. Histograms with the same relative_error merge by adding
+    bucket counts.
+    """
+
+    MIN_VALUE = 1e-3
+
+    def __init__(self, relative_error=0.01):
+        self.relative_error = relative_error
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = {}
+        self.zero = 0
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index):
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def record(self, value, ok=True, count=1):
+        if value <= self.MIN_VALUE:
+            self.zero += count
+        else:
+            index = self._index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if not ok:
+            self.errors += count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if other.relative_error != self.relative_error:
+            raise ValueError("Cannot merge histograms with different relative_error.")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        for name, pick in (("min", min), ("max", max)):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            setattr(self, name, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        return self
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), or None if empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def count_above(self, threshold):
+        """Number of samples above threshold, to within one bucket."""
+        if threshold <= self.MIN_VALUE:
+            return self.count - self.zero
+        limit = self._index(threshold)
+        return sum(count for index, count in self.buckets.items() if index > limit)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        """Compact form: buckets as an offset plus a dense list of counts."""
+        data = {"e": self.relative_error, "n": self.count, "err": self.errors, "sum": round(self.total, 3),
+                "min": self.min, "max": self.max, "z": self.zero}
+        if self.buckets:
+            low, high = min(self.buckets), max(self.buckets)
+            data["o"] = low
+            data["b"] = [self.buckets.get(index, 0) for index in range(low, high + 1)]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["e"])
+        histogram.count, histogram.errors, histogram.total = data["n"], data["err"], data["sum"]
+        histogram.min, histogram.max, histogram.zero = data["min"], data["max"], data["z"]
+        histogram.buckets = {data["o"] + i: count for i, count in enumerate(data.get("b", [])) if count}
+        return histogram
+
+
+class LatencyStats:
+    """Histograms per (flow, step, endpoint): one for all time plus one per SLOT_SECONDS slot.
+
+    Slots older than retention are dropped; they back burn-rate queries
+    over recent windows. Updating costs one bucket increment per sample, so
+    percentiles never require rereading the result log.
+    """
+
+    def __init__(self, relative_error=0.01, retention=RETENTION):
+        self.relative_error = relative_error
+        self.retention = retention
+        self.totals = {}
+        self.slots = {}
+
+    def record(self, key, value, ok=True, timestamp=None):
+        """Records one latency (ms) for key = (flow, step, endpoint)."""
+        key = tuple(key)
+        timestamp = time.time() if timestamp is None else timestamp
+        slot = int(timestamp // SLOT_SECONDS) * SLOT_SECONDS
+        for histograms in (self.totals, self.slots.setdefault(slot, {})):
+            if key not in histograms:
+                histograms[key] = LatencyHistogram(self.relative_error)
+            histograms[key].record(value, ok)
+
+    def ingest_run(self, record):
+        """Records a run timeline (RunTimeline.to_record) and each of its spans."""
+        timestamp = record.get("logged_at", record["started_at"])
+        self.record((record["flow"], "run", ""), record["duration_ms"], bool(record.get("ok")), timestamp)
+        for span_record in record["spans"]:
+            tags = span_record.get("tags", {})
+            # a batch is known by the steps it runs, so different batches of one flow stay apart
+            endpoint = tags.get("url") or tags.get("label") or tags.get("route") or "+".join(tags.get("steps", ()))
+            self.record((record["flow"], span_record["name"], endpoint), span_record["duration_ms"],
+                        "error" not in span_record, timestamp)
+
+    def ingest_probe(self, result, flow="status"):
+        """Records one check_website_status probe result."""
+        self.record((flow, result["name"], result["url"]), result["total_ms"], result["ok"], result["timestamp"])
+
+    def prune(self, now=None):
+        cutoff = (now or time.time()) - self.retention
+        for slot in [slot for slot in self.slots if slot + SLOT_SECONDS < cutoff]:
+            del self.slots[slot]
+
+    def merge(self, other):
+        for key, histogram in other.totals.items():
+            self.totals.setdefault(key, LatencyHistogram(self.relative_error)).merge(histogram)
+        for slot, histograms in other.slots.items():
+            mine = self.slots.setdefault(slot, {})
+            for key, histogram in histograms.items():
+                mine.setdefault(key, LatencyHistogram(self.relative_error)).merge(histogram)
+        return self
+
+    def keys(self):
+        return sorted(self.totals)
+
+    def percentiles(self, key, quantiles=(0.5, 0.95, 0.99)):
+        """Returns {quantile: ms} for key over all recorded history."""
+        histogram = self.totals.get(tuple(key))
+        return {q: histogram.quantile(q) if histogram else None for q in quantiles}
+
+    def window(self, key, seconds, now=None):
+        """Merged histogram for key over the last seconds (rounded out to whole slots)."""
+        now = now or time.time()
+        merged = LatencyHistogram(self.relative_error)
+        for slot, histograms in self.slots.items():
+            if slot + SLOT_SECONDS > now - seconds and tuple(key) in histograms:
+                merged.merge(histograms[tuple(key)])
+        return merged
+
+    def burn_rate(self, key, slo_ms, target=0.99, seconds=3600, now=None):
+        """Error-budget burn rate over a window: 1.0 spends the budget exactly on schedule.
+
+        Bad samples are those that failed or took longer than slo_ms; the
+        histograms do not track the overlap, so the larger of the two counts
+        is used. The budget is the 1 - target fraction allowed to be bad.
+        """
+        histogram = self.window(key, seconds, now)
+        if not histogram.count:
+            return None
+        bad = max(histogram.errors, histogram.count_above(slo_ms))
+        return bad / histogram.count / (1 - target)
+
+    def to_dict(self):
+        def encode(histograms):
+            return [{"key": list(key), "h": histogram.to_dict()} for key, histogram in histograms.items()]
+
+        return {
+            "relative_error": self.relative_error,
+            "totals": encode(self.totals),
+            "slots": {str(slot): encode(histograms) for slot, histograms in self.slots.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, retention=RETENTION):
+        stats = cls(data["relative_error"], retention)
+
+        def decode(entries):
+            return {tuple(entry["key"]): LatencyHistogram.from_dict(entry["h"]) for entry in entries}
+
+        stats.totals = decode(data["totals"])
+        stats.slots = {int(slot): decode(entries) for slot, entries in data["slots"].items()}
+        return stats
+
+    def save(self, filepath):
+        self.prune()
+        atomic_write(filepath, json.dumps(self.to_dict(), separators=(",", ":")).encode())
+
+    @classmethod
+    def load(cls, filepath):
+        try:
+            with open(filepath, "r") as file:
+                return cls.from_dict(json.load(file))
+        except FileNotFoundError:
+            return cls()
+
+    @classmethod
+    def load_all(cls, directory=RESULTS_DIR):
+        """Merges every runner's stats file in directory."""
+        stats = cls()
+        for filepath in sorted(glob.glob(os.path.join(directory, STATS_PATTERN))):
+            stats.merge(cls.load(filepath))
+        return stats
+
+
+def print_stats(stats, slo_ms=None, target=0.99, window=3600):
+    print(f"{'flow':<16}{'step':<12}{'endpoint':<36}{'count':>7}{'err':>5}{'p50':>8}{'p95':>8}{'p99':>8}"
+          + (f"{'burn':>7}" if slo_ms else ""))
+    for key in stats.keys():
+        histogram = stats.totals[key]
+        p50, p95, p99 = (histogram.quantile(q) for q in (0.5, 0.95, 0.99))
+        line = (f"{key[0]:<16}{key[1]:<12}{key[2][-35:]:<36}{histogram.count:>7}{histogram.errors:>5}"
+                f"{p50:>8.0f}{p95:>8.0f}{p99:>8.0f}")
+        if slo_ms:
+            burn = stats.burn_rate(key, slo_ms, target, window)
+            line += f"{burn:>7.2f}" if burn is not None else f"{'-':>7}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show latency percentiles from the runners' stats files.")
+    parser.add_argument("--directory", default=RESULTS_DIR)
+    parser.add_argument("--slo-ms", type=float, help="latency objective for burn-rate reporting")
+    parser.add_argument("--target", type=float, default=0.99, help="fraction of samples that must meet the SLO")
+    parser.add_argument("--window", type=int, default=3600, help="burn-rate window in seconds")
+    args = parser.parse_args()
+    print_stats(LatencyStats.load_all(args.directory), args.slo_ms, args.target, args.window)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+// Client-side compose flow of the mock message center. Element ids match the
+// real portal so the appeals step plan runs unchanged.
+(function () {
+    const ERROR_MESSAGE = "Sorry, looks like something isn't working.";
+    const compose = document.getElementById("compose");
+
+    function showError() {
+        if (document.querySelector(".ant-error-container")) {
+            return;
+        }
+        const error = document.createElement("div");
+        error.className = "ant-error-container";
+        error.textContent = ERROR_MESSAGE;
+        document.body.insertBefore(error, document.body.firstChild);
+    }
+
+    function api(method, path, body) {
+        return fetch(path, {
+            method: method,
+            headers: body ? {"Content-Type": "application/json"} : {},
+            body: body ? JSON.stringify(body) : undefined,
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        }).catch(function (e) {
+            showError();
+            throw e;
+        });
+    }
+
+    function element(tag, attributes, text) {
+        const node = document.createElement(tag);
+        Object.keys(attributes || {}).forEach(function (name) {
+            node.setAttribute(name, attributes[name]);
+        });
+        if (text) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    // Ant Design style select: a trigger button and a list of options rendered on click
+    function dropdown(id, label, options, onSelect) {
+        const wrapper = element("div", {"class": "dropdown"});
+        const button = element("button", {id: id + "_button", type: "button"}, label);
+        const list = element("ul", {"class": "hidden", role: "listbox"});
+        options.forEach(function (option, index) {
+            const item = element("li", {id: id + "_option-" + index, role: "option"}, option);
+            item.addEventListener("click", function () {
+                button.textContent = option;
+                list.classList.add("hidden");
+                onSelect(index, option);
+            });
+            list.appendChild(item);
+        });
+        button.addEventListener("click", function () {
+            list.classList.toggle("hidden");
+        });
+        wrapper.appendChild(button);
+        wrapper.appendChild(list);
+        return wrapper;
+    }
+
+    function clearAfter(node) {
+        while (node.nextSibling) {
+            node.parentNode.removeChild(node.nextSibling);
+        }
+    }
+
+    function appealForm(after) {
+        const form = element("div", {id: "appealGreivance"});
+        form.appendChild(element("label", {"for": "txtEmail-appealGreivance"}, "Email"));
+        const email = element("input", {id: "txtEmail-appealGreivance", type: "email"});
+        form.appendChild(email);
+        form.appendChild(element("label", {"for": "txtAddDetail-appealGreivance"}, "Details"));
+        const details = element("textarea", {id: "txtAddDetail-appealGreivance"});
+        form.appendChild(details);
+        const next = element("button", {id: "mcv2-griev-appeal-submit", type: "button"}, "Continue");
+        const submit = element("button", {id: "btnSubmitMsg", type: "button", "class": "hidden"}, "Send");
+        next.addEventListener("click", function () {
+            if (email.value && details.value) {
+                submit.classList.remove("hidden");
+            }
+        });
+        submit.addEventListener("click", function () {
+            api("POST", "/member/api/new-message", {
+                category: after.category,
+                subcategory: after.subcategory,
+                email: email.value,
+                details: details.value,
+            }).then(function (result) {
+                compose.innerHTML = "";
+                compose.appendChild(element("p", {id: "msgConfirmation"}, "Message " + result.id + " sent."));
+            }, function () {});
+        });
+        form.appendChild(next);
+        form.appendChild(submit);
+        return form;
+    }
+
+    function appealTypes(selection) {
+        const group = element("div", {id: "appealType", role: "radiogroup"});
+        ["Grievance", "Appeal"].forEach(function (label, index) {
+            const id = "rbtnAppealType-appealGreivance-" + index;
+            const radio = element("input", {id: id, type: "radio", name: "appealType", value: label});
+            radio.addEventListener("click", function () {
+                clearAfter(group);
+                group.parentNode.appendChild(appealForm(selection));
+            });
+            group.appendChild(radio);
+            group.appendChild(element("label", {"for": id}, label));
+        });
+        return group;
+    }
+
+    function openCompose() {
+        compose.innerHTML = "";
+        api("GET", "/member/api/message-categories").then(function (categories) {
+            const categorySelect = dropdown("ddlNewMsgCat", "Select a category", categories, function (index) {
+                clearAfter(categorySelect);
+                api("GET", "/member/api/message-subcategories?category=" + index).then(function (subcategories) {
+                    const subSelect = dropdown("ddlNewMsgCatSub", "Select a topic", subcategories, function (subIndex) {
+                        clearAfter(subSelect);
+                        compose.appendChild(appealTypes({category: index, subcategory: subIndex}));
+                    });
+                    compose.appendChild(subSelect);
+                }, function () {});
+            });
+            compose.appendChild(categorySelect);
+        }, function () {});
+    }
+
+    // the compose view has its own URL, like the portal's, so it can be deep-linked
+    document.getElementById("btnComposeMessage").addEventListener("click", function () {
+        history.replaceState(null, "", "#compose");
+        openCompose();
+    });
+    if (location.hash === "#compose") {
+        openCompose();
+    }
+})();
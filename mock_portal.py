@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from page_state import ERROR_CONTAINER_SELECTOR, ERROR_MESSAGE
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_pages")
+
+PAGES = {
+    "/ca/login/": "login.html",
+    "/member/find-care": "find_care.html",
+    "/member/messages": "messages.html",
+}
+STATIC_TYPES = {".js": "application/javascript", ".css": "text/css"}
+
+CATEGORIES = [f"Category {i}" for i in range(14)] + ["Appeals and Grievances", "Other"]
+SUBCATEGORIES = ["File an appeal or grievance", "Check the status of an appeal"]
+
+ERROR_HTML = f'<div class="{ERROR_CONTAINER_SELECTOR.lstrip(".")}">{ERROR_MESSAGE}</div>'
+SESSION_COOKIE = "SMSESSION"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockPortal/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.portal.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method):
+        portal = self.server.portal
+        parts = urlsplit(self.path)
+        portal.count(method, parts.path)
+        portal.delay(parts.path)
+        fail = portal.should_fail(parts.path)
+
+        if parts.path.startswith("/static/"):
+            return self._static(parts.path[len("/static/"):])
+        if parts.path.startswith("/member/") and portal.require_login and not self._logged_in():
+            return self._redirect("/ca/login/")
+        if method == "GET" and parts.path in PAGES:
+            return self._page(PAGES[parts.path], fail)
+        if method == "POST" and parts.path == "/ca/login/":
+            self._read_body()
+            return self._redirect("/member/find-care", f"{SESSION_COOKIE}=mock-{int(time.time())}; Path=/; HttpOnly")
+        if parts.path.startswith("/member/api/"):
+            if fail:
+                return self._json({"error": "injected failure"}, 500)
+            return self._api(method, parts.path[len("/member/api/"):], parse_qs(parts.query))
+        self._json({"error": "not found"}, 404)
+
+    def _logged_in(self):
+        return f"{SESSION_COOKIE}=" in (self.headers.get("Cookie") or "")
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _api(self, method, name, query):
+        if method == "GET" and name == "message-categories":
+            return self._json(CATEGORIES)
+        if method == "GET" and name == "message-subcategories":
+            return self._json(SUBCATEGORIES if query.get("category") == ["14"] else ["General question"])
+        if method == "POST" and name == "new-message":
+            body = self._read_body()
+            try:
+                message = json.loads(body or b"{}")
+            except ValueError:
+                return self._json({"error": "invalid JSON"}, 400)
+            return self._json({"id": self.server.portal.submit(message)}, 201)
+        self._json({"error": "not found"}, 404)
+
+    def _page(self, filename, fail):
+        with open(os.path.join(PAGES_DIR, filename), "rb") as file:
+            body = file.read()
+        if fail:
+            body = body.replace(b"<!--error-->", ERROR_HTML.encode())
+        self._send(200, "text/html; charset=utf-8", body)
+
+    def _static(self, filename):
+        path = os.path.join(PAGES_DIR, os.path.basename(filename))
+        content_type = STATIC_TYPES.get(os.path.splitext(path)[1])
+        if content_type is None or not os.path.exists(path):
+            return self._json({"error": "not found"}, 404)
+        with open(path, "rb") as file:
+            self._send(200, content_type, file.read(), {"Cache-Control": "max-age=300"})
+
+    def _json(self, value, status=200):
+        self._send(status, "application/json", json.dumps(value).encode())
+
+    def _redirect(self, location, cookie=None):
+        headers = {"Location": location}
+        if cookie:
+            headers["Set-Cookie"] = cookie
+        self._send(302, "text/plain", b"", headers)
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockPortal:
+    """A local stand-in for the member portal, for offline end-to-end runs.
+
+    Serves the login, find-care and message center pages with the element
+    ids the appeals flow uses, the compose dropdown APIs and a new-message
+    endpoint that records submissions. Every response is delayed by
+    latency_ms +/- jitter_ms (api_latency_ms for /member/api/ calls when
+    set), and error_rate is the chance that a page renders the portal's
+    error container or an API call answers 500.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0, api_latency_ms=None, error_rate=0.0,
+                 require_login=False, seed=None, verbose=False):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.api_latency_ms = api_latency_ms
+        self.error_rate = error_rate
+        self.require_login = require_login
+        self.verbose = verbose
+        self.submissions = []
+        self.hits = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.portal = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path="/member/find-care"):
+        return self.base_url + path
+
+    def count(self, method, path):
+        with self._lock:
+            key = f"{method} {path}"
+            self.hits[key] = self.hits.get(key, 0) + 1
+
+    def delay(self, path):
+        base = self.api_latency_ms if self.api_latency_ms is not None and path.startswith("/member/api/") \
+            else self.latency_ms
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if base + jitter > 0:
+            time.sleep((base + jitter) / 1000)
+
+    def should_fail(self, path):
+        if path.startswith("/static/") or not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def submit(self, message):
+        with self._lock:
+            self.submissions.append(message)
+            return len(self.submissions)
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        """Serves in a background thread; returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the member portal.")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random +/- variation of the delay")
+    parser.add_argument("--api-latency-ms", type=float, help="delay for /member/api/ calls instead of --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of pages and API calls that fail")
+    parser.add_argument("--require-login", action="store_true", help="redirect /member/ pages without a session")
+    args = parser.parse_args()
+
+    portal = MockPortal(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        api_latency_ms=args.api_latency_ms, error_rate=args.error_rate,
+                        require_login=args.require_login, verbose=True)
+    print(f"Mock portal at {portal.url()} (login: {portal.url('/ca/login/')})")
+    try:
+        portal.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        portal._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
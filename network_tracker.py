@@ -0,0 +1,142 @@
+import fnmatch
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import TimeoutException
+
+from devtools import DevToolsSession
+
+
+class NetworkTracker:
+    """Follows a page's XHR/fetch traffic through Network events.
+
+    Keeps the set of requests in flight and a short history of completed
+    ones, numbered in completion order, so a step can wait for the network
+    to go idle or for the response it depends on instead of sleeping.
+    Listeners run on the DevTools reader thread; waiters block on a
+    condition that the listeners notify.
+    """
+
+    def __init__(self, session, resource_types=("XHR", "Fetch"), owns_session=False, history=200):
+        self.session = session
+        self.resource_types = set(resource_types)
+        self.owns_session = owns_session
+        self._in_flight = {}
+        self._statuses = {}
+        self._completed = deque(maxlen=history)
+        self._seq = 0
+        self._last_activity = time.monotonic()
+        self._condition = threading.Condition()
+        self.started = False
+
+    @classmethod
+    def for_driver(cls, driver, **options):
+        """Creates a tracker on a dedicated DevTools session for the driver's page."""
+        return cls(DevToolsSession.for_driver(driver), owns_session=True, **options)
+
+    def start(self):
+        self.session.on("Network.requestWillBeSent", self._on_request)
+        self.session.on("Network.responseReceived", self._on_response)
+        self.session.on("Network.loadingFinished", self._on_finished)
+        self.session.on("Network.loadingFailed", self._on_failed)
+        self.session.send("Network.enable")
+        self.started = True
+        return self
+
+    def stop(self):
+        self.started = False
+        for event, callback in (("Network.requestWillBeSent", self._on_request),
+                                ("Network.responseReceived", self._on_response),
+                                ("Network.loadingFinished", self._on_finished),
+                                ("Network.loadingFailed", self._on_failed)):
+            self.session.off(event, callback)
+        if self.owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def mark(self):
+        """A position in the completion history; pass it as since= to ignore earlier responses."""
+        with self._condition:
+            return self._seq
+
+    def in_flight(self):
+        with self._condition:
+            return len(self._in_flight)
+
+    def wait_for_idle(self, idle_ms=500, timeout=10):
+        """Waits until no tracked request has been in flight or started for idle_ms.
+
+        The quiet period is measured from the call at the earliest, so a
+        request fired just after a click still counts.
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        idle = idle_ms / 1000
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                quiet_since = max(self._last_activity, started)
+                if not self._in_flight and now - quiet_since >= idle:
+                    return
+                if now >= deadline:
+                    pending = ", ".join(url for url, _ in list(self._in_flight.values())[:3])
+                    raise TimeoutException(f"Timed out after {timeout}s waiting for network idle"
+                                           + (f" ({len(self._in_flight)} in flight: {pending})" if pending else ""))
+                wake = deadline if self._in_flight else min(deadline, quiet_since + idle)
+                self._condition.wait(max(wake - now, 0.001))
+
+    def wait_for_response(self, url_pattern, since=None, timeout=10):
+        """Waits for a tracked request matching the glob to complete after since; returns its record."""
+        since = self.mark() if since is None else since
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                for record in self._completed:
+                    if record["seq"] > since and fnmatch.fnmatchcase(record["url"], url_pattern):
+                        return record
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutException(f"Timed out after {timeout}s waiting for a response to '{url_pattern}'")
+                self._condition.wait(remaining)
+
+    def _on_request(self, event):
+        if event.get("type") not in self.resource_types:
+            return
+        with self._condition:
+            self._in_flight[event["requestId"]] = (event["request"]["url"], time.monotonic())
+            self._last_activity = time.monotonic()
+            self._condition.notify_all()
+
+    def _on_response(self, event):
+        with self._condition:
+            if event["requestId"] in self._in_flight:
+                self._statuses[event["requestId"]] = event["response"]["status"]
+
+    def _complete(self, request_id, failed):
+        with self._condition:
+            request = self._in_flight.pop(request_id, None)
+            if request is None:
+                return
+            url, started = request
+            self._seq += 1
+            self._completed.append({
+                "seq": self._seq,
+                "url": url,
+                "status": self._statuses.pop(request_id, None),
+                "failed": failed,
+                "duration_ms": (time.monotonic() - started) * 1000,
+            })
+            self._last_activity = time.monotonic()
+            self._condition.notify_all()
+
+    def _on_finished(self, event):
+        self._complete(event["requestId"], False)
+
+    def _on_failed(self, event):
+        self._complete(event["requestId"], True)
@@ -0,0 +1,128 @@
+from instrumentation import current_timeline
+
+# Tracks LCP and CLS from document start. buffered: true also replays
+# entries recorded before the observer existed, so installing late works.
+VITALS_JS = """
+(function () {
+    if (window.__pageVitals || typeof PerformanceObserver === "undefined") {
+        return;
+    }
+    const vitals = {lcp: null, cls: 0, resourceCursor: 0, collected: 0, lcpReported: null, clsReported: 0};
+    window.__pageVitals = vitals;
+    try {
+        new PerformanceObserver(function (list) {
+            const entries = list.getEntries();
+            const last = entries[entries.length - 1];
+            vitals.lcp = last.renderTime || last.loadTime || last.startTime;
+        }).observe({type: "largest-contentful-paint", buffered: true});
+        new PerformanceObserver(function (list) {
+            for (const entry of list.getEntries()) {
+                if (!entry.hadRecentInput) {
+                    vitals.cls += entry.value;
+                }
+            }
+        }).observe({type: "layout-shift", buffered: true});
+    } catch (e) {
+        // entry types unsupported by this browser
+    }
+})();
+"""
+
+COLLECT_SCRIPT = VITALS_JS + """
+const vitals = window.__pageVitals || {lcp: null, cls: null, resourceCursor: 0, collected: 0, lcpReported: null, clsReported: 0};
+// a later collection on the same document follows an SPA route change: the navigation entry,
+// paints and LCP still describe the document load, so only what changed since is reported
+const soft = vitals.collected > 0;
+vitals.collected += 1;
+const navigation = soft ? null : performance.getEntriesByType("navigation")[0];
+const lcp = vitals.lcp !== vitals.lcpReported ? vitals.lcp : null;
+const cls = vitals.cls === null ? null : vitals.cls - vitals.clsReported;
+vitals.lcpReported = vitals.lcp;
+vitals.clsReported = vitals.cls || 0;
+const resources = performance.getEntriesByType("resource");
+// only resources loaded since the last collection on this document (SPA route changes)
+const fresh = resources.slice(vitals.resourceCursor);
+vitals.resourceCursor = resources.length;
+const paints = {};
+for (const entry of soft ? [] : performance.getEntriesByType("paint")) {
+    paints[entry.name] = entry.startTime;
+}
+const byType = {};
+for (const entry of fresh) {
+    const type = byType[entry.initiatorType] || (byType[entry.initiatorType] = {count: 0, transferSize: 0, duration: 0});
+    type.count += 1;
+    type.transferSize += entry.transferSize || 0;
+    type.duration += entry.duration;
+}
+const slowest = fresh.slice().sort(function (a, b) { return b.duration - a.duration; }).slice(0, arguments[0])
+    .map(function (entry) {
+        return {name: entry.name, type: entry.initiatorType, duration: entry.duration, transferSize: entry.transferSize};
+    });
+return {
+    url: location.href,
+    soft: soft,
+    navigation: navigation ? {
+        type: navigation.type,
+        ttfb: navigation.responseStart - navigation.startTime,
+        domContentLoaded: navigation.domContentLoadedEventEnd - navigation.startTime,
+        load: navigation.loadEventEnd - navigation.startTime,
+        transferSize: navigation.transferSize,
+    } : null,
+    paint: paints,
+    vitals: {lcp: lcp, cls: cls},
+    resources: {count: fresh.length, byType: byType, slowest: slowest},
+};
+"""
+
+# Performance.getMetrics counters worth keeping per page
+METRIC_NAMES = (
+    "JSHeapUsedSize",
+    "JSHeapTotalSize",
+    "Nodes",
+    "LayoutCount",
+    "RecalcStyleCount",
+    "LayoutDuration",
+    "RecalcStyleDuration",
+    "ScriptDuration",
+    "TaskDuration",
+)
+
+
+def install_page_metrics(driver):
+    """Enables CDP Performance counters and installs the vitals observer at document start."""
+    driver.execute_cdp_cmd("Performance.enable", {})
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": VITALS_JS})
+
+
+def collect_page_metrics(driver, label, slowest=5):
+    """Collects timing, vitals and CDP counters for the current page.
+
+    After an SPA route change (no new document since the last collection)
+    the record is marked soft: navigation and paint timings are left out,
+    LCP is reported only if a new candidate appeared and CLS is the shift
+    since the last collection. The record is added to the active timeline
+    under "pages" and returned.
+    """
+    record = driver.execute_script(COLLECT_SCRIPT, slowest)
+    record["label"] = label
+    try:
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    except Exception:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    record["metrics"] = {m["name"]: m["value"] for m in metrics if m["name"] in METRIC_NAMES}
+
+    timeline = current_timeline()
+    if timeline is not None:
+        timeline.add("pages", record)
+    return record
+
+
+def print_page_metrics(record):
+    navigation = record["navigation"] or {}
+    vitals = record["vitals"]
+    lcp = f"{vitals['lcp']:.0f} ms" if vitals.get("lcp") is not None else "n/a"
+    timing = "route change" if record.get("soft") else \
+        f"ttfb {navigation.get('ttfb', 0):.0f} ms, load {navigation.get('load', 0):.0f} ms"
+    print(f"[{record['label']}] {timing}, LCP {lcp}, CLS {vitals.get('cls') or 0:.3f}, "
+          f"{record['resources']['count']} resources")
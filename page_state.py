@@ -0,0 +1,79 @@
+from selenium.webdriver.common.by import By
+
+ERROR_CONTAINER_SELECTOR = ".ant-error-container"
+ERROR_MESSAGE = "Sorry, looks like something isn't working."
+
+# Reports the error container and the target element in a single round trip.
+PROBE_SCRIPT = """
+const errorSelector = arguments[0];
+const target = arguments[1];
+const error = document.querySelector(errorSelector);
+const state = {
+    url: location.href,
+    readyState: document.readyState,
+    errorPresent: !!error,
+    errorText: error ? (error.innerText || error.textContent || "").trim() : null,
+    elementPresent: false,
+    elementVisible: false,
+    elementEnabled: false,
+    elementClickable: false,
+    element: null,
+};
+if (!target) {
+    return state;
+}
+const element = target.id ? document.getElementById(target.id) : document.querySelector(target.css);
+if (!element) {
+    return state;
+}
+state.elementPresent = true;
+state.element = element;
+const rect = element.getBoundingClientRect();
+const style = window.getComputedStyle(element);
+state.elementVisible = rect.width > 0 && rect.height > 0
+    && style.visibility !== "hidden" && style.display !== "none";
+state.elementEnabled = !element.disabled && element.getAttribute("aria-disabled") !== "true";
+if (state.elementVisible && state.elementEnabled) {
+    const x = Math.min(Math.max(rect.left + rect.width / 2, 0), window.innerWidth - 1);
+    const y = Math.min(Math.max(rect.top + rect.height / 2, 0), window.innerHeight - 1);
+    const hit = document.elementFromPoint(x, y);
+    // off-screen elements are scrolled into view by the click itself
+    const offscreen = rect.bottom < 0 || rect.top > window.innerHeight;
+    state.elementClickable = offscreen || !hit || hit === element || element.contains(hit) || hit.contains(element);
+}
+return state;
+"""
+
+
+def locator_target(locator_type, locator_value):
+    """Converts a selenium locator into the {id|css} form the injected scripts accept."""
+    if locator_value is None:
+        return None
+    if locator_type == By.ID:
+        return {"id": locator_value}
+    if locator_type == By.CSS_SELECTOR:
+        return {"css": locator_value}
+    if locator_type == By.CLASS_NAME:
+        return {"css": "." + locator_value}
+    raise ValueError(f"Unsupported locator type for page probe: {locator_type}")
+
+
+def probe_page_state(driver, element_id=None, locator_type=By.ID):
+    """Returns the error banner and target element state of the page in one script call."""
+    return driver.execute_script(PROBE_SCRIPT, ERROR_CONTAINER_SELECTOR, locator_target(locator_type, element_id))
+
+
+def has_error(state):
+    """True if the probed page shows the portal's generic error banner."""
+    return state["errorPresent"] and ERROR_MESSAGE in (state["errorText"] or "")
+
+
+def check_precondition(driver, element_id=None, locator_type=By.ID, require_clickable=True):
+    """Probes the page and returns (ok, state) for use as a precondition before a step."""
+    state = probe_page_state(driver, element_id, locator_type)
+    if has_error(state):
+        return False, state
+    if element_id is not None:
+        ready = state["elementClickable"] if require_clickable else state["elementPresent"]
+        return ready, state
+    return True, state
@@ -0,0 +1,241 @@
+import fnmatch
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+from cookie_vault import atomic_write
+from devtools import DevToolsSession
+from result_log import RESULTS_DIR
+
+SIZES_FILE = os.path.join(RESULTS_DIR, "resource_sizes.json")
+
+# analytics, tag managers, session replay, chat and web fonts; none of them drive the form
+THIRD_PARTY_TAGS = [
+    "*google-analytics.com/*",
+    "*googletagmanager.com/*",
+    "*doubleclick.net/*",
+    "*connect.facebook.net/*",
+    "*bat.bing.com/*",
+    "*hotjar.com/*",
+    "*assets.adobedtm.com/*",
+    "*.demdex.net/*",
+    "*.omtrdc.net/*",
+    "*.2o7.net/*",
+    "*js-agent.newrelic.com/*",
+    "*bam.nr-data.net/*",
+    "*quantummetric.com/*",
+    "*qualtrics.com/*",
+    "*.liveperson.net/*",
+    "*lpsnmedia.net/*",
+    "*fonts.googleapis.com/*",
+    "*fonts.gstatic.com/*",
+]
+
+# "types" are Fetch/Network ResourceType values, "urls" are Network.setBlockedURLs patterns
+PROFILES = {
+    "none": {"types": [], "urls": []},
+    "no-tags": {"types": [], "urls": THIRD_PARTY_TAGS},
+    "functional-only": {"types": ["Image", "Media", "Font", "Ping", "Manifest", "Prefetch"], "urls": THIRD_PARTY_TAGS},
+}
+
+# resources the flow needs even though their type is blocked: icon-only buttons are SVG images
+ALLOWLIST = ["*.anthem.com/*.svg*"]
+
+# URLs whose sizes are remembered; the least recently loaded are forgotten first
+MAX_SIZED_URLS = 2000
+
+# requests awaiting loadingFinished/loadingFailed (long polls and dropped events never get one),
+# and requests Fetch blocked before Network reported them
+MAX_PENDING = 1000
+
+
+def _size_key(url):
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+class ResourceSizes:
+    """Transfer sizes learned from loaded resources, used to estimate the bytes blocking saves."""
+
+    def __init__(self, filepath=SIZES_FILE, max_urls=MAX_SIZED_URLS):
+        self.filepath = filepath
+        self.max_urls = max_urls
+        try:
+            with open(filepath, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            data = {}
+        # oldest first; a URL moves to the end whenever it loads again
+        self.urls = data.get("urls", {})
+        self.types = data.get("types", {})
+        self.dirty = False
+
+    def learn(self, url, resource_type, size):
+        key = _size_key(url)
+        previous = self.urls.pop(key, None)
+        self.urls[key] = size
+        while len(self.urls) > self.max_urls:
+            del self.urls[next(iter(self.urls))]
+        count, total = self.types.get(resource_type, (0, 0))
+        self.types[resource_type] = (count + 1, total + size)
+        self.dirty = self.dirty or previous != size
+
+    def estimate(self, url, resource_type):
+        """The last seen size of the URL (ignoring its query), else the mean size of its type, else 0."""
+        if _size_key(url) in self.urls:
+            return self.urls[_size_key(url)]
+        count, total = self.types.get(resource_type, (0, 0))
+        return total // count if count else 0
+
+    def save(self):
+        """Writes the sizes if a URL was added or changed size since the last save."""
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        atomic_write(self.filepath, json.dumps({"urls": self.urls, "types": self.types}).encode())
+        self.dirty = False
+
+
+class ResourceBlocker:
+    """Blocks resources the form flow doesn't need for the life of a page session.
+
+    URL patterns go to Network.setBlockedURLs, which drops them inside the
+    browser without a round trip. Resource types are blocked through Fetch
+    interception so ALLOWLIST globs can let individual URLs through. Blocked
+    requests never report a size, so their bytes are estimated from sizes
+    learned while loading (run the "none" profile now and then to learn).
+    """
+
+    def __init__(self, session, profile="functional-only", allow=ALLOWLIST, sizes=None, owns_session=False):
+        self.session = session
+        self.profile = profile
+        self.types = PROFILES[profile]["types"]
+        self.urls = PROFILES[profile]["urls"]
+        self.allow = list(allow)
+        self.sizes = sizes or ResourceSizes()
+        self.owns_session = owns_session
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._fetch_blocked = {}
+        self.reset_counts()
+
+    @classmethod
+    def for_driver(cls, driver, profile="functional-only", **options):
+        """Creates a blocker on a dedicated DevTools session for the driver's page."""
+        return cls(DevToolsSession.for_driver(driver), profile, owns_session=True, **options)
+
+    def start(self):
+        self.session.on("Network.requestWillBeSent", self._on_request)
+        self.session.on("Network.loadingFinished", self._on_finished)
+        self.session.on("Network.loadingFailed", self._on_failed)
+        self.session.send("Network.enable")
+        self.session.send("Network.setBlockedURLs", {"urls": self.urls})
+        if self.types:
+            self.session.on("Fetch.requestPaused", self._on_request_paused)
+            self.session.send("Fetch.enable", {"patterns": [
+                {"resourceType": resource_type, "requestStage": "Request"} for resource_type in self.types
+            ]})
+        return self
+
+    def stop(self):
+        for event, callback in (("Network.requestWillBeSent", self._on_request),
+                                ("Network.loadingFinished", self._on_finished),
+                                ("Network.loadingFailed", self._on_failed),
+                                ("Fetch.requestPaused", self._on_request_paused)):
+            self.session.off(event, callback)
+        try:
+            self.session.send("Network.setBlockedURLs", {"urls": []})
+            if self.types:
+                self.session.send("Fetch.disable")
+        except Exception:
+            pass
+        if self.owns_session:
+            self.session.close()
+
+    def reset_counts(self):
+        with self._lock:
+            self.blocked = {}
+            self.loaded = 0
+            self.loaded_bytes = 0
+            # requests still open from the last run will not be counted in this one
+            self._requests.clear()
+            self._fetch_blocked.clear()
+
+    def report(self):
+        """Returns this run's blocked and loaded counts and saves the learned sizes."""
+        with self._lock:
+            report = {
+                "profile": self.profile,
+                "blocked": sum(entry["count"] for entry in self.blocked.values()),
+                "blocked_bytes_est": sum(entry["bytes"] for entry in self.blocked.values()),
+                "by_type": {resource_type: dict(entry) for resource_type, entry in self.blocked.items()},
+                "loaded": self.loaded,
+                "loaded_bytes": self.loaded_bytes,
+            }
+        self.sizes.save()
+        return report
+
+    def _count_blocked(self, url, resource_type):
+        entry = self.blocked.setdefault(resource_type, {"count": 0, "bytes": 0})
+        entry["count"] += 1
+        entry["bytes"] += self.sizes.estimate(url, resource_type)
+
+    # the handlers below run on the DevTools reader thread; never block on a reply there
+
+    def _on_request_paused(self, event):
+        url = event["request"]["url"]
+        if any(fnmatch.fnmatchcase(url, pattern) for pattern in self.allow):
+            self.session.send_async("Fetch.continueRequest", {"requestId": event["requestId"]})
+            return
+        self.session.send_async("Fetch.failRequest", {"requestId": event["requestId"], "errorReason": "BlockedByClient"})
+        with self._lock:
+            # Fetch can pause a request before Network reports it; remember it so a late report is ignored
+            if self._requests.pop(event.get("networkId"), None) is None and event.get("networkId"):
+                self._fetch_blocked[event["networkId"]] = None
+                while len(self._fetch_blocked) > MAX_PENDING:
+                    del self._fetch_blocked[next(iter(self._fetch_blocked))]
+            self._count_blocked(url, event.get("resourceType", "Other"))
+
+    def _on_request(self, event):
+        with self._lock:
+            if self._fetch_blocked.pop(event["requestId"], False) is None:
+                return
+            self._requests[event["requestId"]] = (event["request"]["url"], event.get("type", "Other"))
+            while len(self._requests) > MAX_PENDING:
+                del self._requests[next(iter(self._requests))]
+
+    def _on_finished(self, event):
+        with self._lock:
+            request = self._requests.pop(event["requestId"], None)
+            if request is None:
+                return
+            self.loaded += 1
+            self.loaded_bytes += int(event.get("encodedDataLength", 0))
+            if event.get("encodedDataLength"):
+                self.sizes.learn(request[0], request[1], int(event["encodedDataLength"]))
+
+    def _on_failed(self, event):
+        with self._lock:
+            request = self._requests.pop(event["requestId"], None)
+            # "inspector" marks requests dropped by Network.setBlockedURLs
+            if request is not None and event.get("blockedReason") == "inspector":
+                self._count_blocked(request[0], event.get("type", request[1]))
+
+
+def install_resource_blocking(driver, profile="functional-only", **options):
+    """Starts blocking on the driver's page, once per driver; returns the blocker with its counts reset."""
+    blocker = getattr(driver, "_resource_blocker", None)
+    if blocker is not None and blocker.profile == profile:
+        blocker.reset_counts()
+        return blocker
+    if blocker is not None:
+        blocker.stop()
+    blocker = ResourceBlocker.for_driver(driver, profile, **options).start()
+    driver._resource_blocker = blocker
+    return blocker
+
+
+def resource_blocker(driver):
+    """The blocker installed on driver, or None."""
+    return getattr(driver, "_resource_blocker", None)
@@ -0,0 +1,252 @@
+import bisect
+import gzip
+import json
+import os
+import threading
+import time
+
+from cookie_vault import atomic_write
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+MANIFEST_FILE = "manifest.json"
+
+
+def _day(timestamp):
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+def _read_index(path):
+    """Reads a sidecar index into parallel (timestamps, offsets) lists."""
+    timestamps, offsets = [], []
+    try:
+        with open(path, "r") as file:
+            for line in file:
+                parts = line.split()
+                if len(parts) == 2:
+                    timestamps.append(float(parts[0]))
+                    offsets.append(int(parts[1]))
+    except FileNotFoundError:
+        pass
+    return timestamps, offsets
+
+
+class ResultLog:
+    """Append-only JSON lines log of run results, segmented and indexed by time.
+
+    Records are stamped with logged_at, buffered in memory and written when
+    flush_bytes have accumulated or flush_interval seconds have passed;
+    fsync runs at most once per fsync_interval. The active segment is
+    rotated once it reaches max_bytes or a new day starts, then
+    gzip-compressed as one member per indexed block. Every segment has a
+    sidecar .idx file of "logged_at offset" lines, one per index_every
+    bytes (offsets of member starts once compressed), and manifest.json
+    lists the closed segments with their time range, so read() only opens
+    the segments that overlap a range and seeks straight to its start.
+
+    One process should write a given directory at a time.
+    """
+
+    def __init__(self, directory=RESULTS_DIR, name="runs", max_bytes=64 * 1024 * 1024, rotate_daily=True,
+                 flush_bytes=64 * 1024, flush_interval=5.0, fsync_interval=1.0, index_every=64 * 1024):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.index_every = index_every
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.index_path = self.path + ".idx"
+
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._index_buffer = []
+        self._last_flush = time.monotonic()
+        self._last_fsync = time.monotonic()
+        self._open_segment()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _open_segment(self):
+        self._file = open(self.path, "ab")
+        self._index_file = open(self.index_path, "a")
+        self._size = self._file.tell()
+        timestamps, offsets = _read_index(self.index_path)
+        self._first_ts = timestamps[0] if timestamps else None
+        self._last_ts = self._recover_tail() if self._size else None
+        self._last_indexed = offsets[-1] if offsets else None
+
+    def _recover_tail(self):
+        """Drops a line left half-written by a crash and returns the last record's logged_at."""
+        # read back until the tail holds the last complete line, however long it is
+        tail, start = b"", self._size
+        with open(self.path, "rb") as file:
+            while start > 0 and tail.count(b"\n") < 2:
+                chunk = min(start, 65536)
+                start -= chunk
+                file.seek(start)
+                tail = file.read(chunk) + tail
+        if not tail.endswith(b"\n"):
+            self._size -= len(tail) - tail.rfind(b"\n") - 1
+            self._file.truncate(self._size)
+            tail = tail[:tail.rfind(b"\n") + 1]
+        lines = tail.splitlines()
+        if not lines:
+            return self._first_ts
+        try:
+            return json.loads(lines[-1])["logged_at"]
+        except (ValueError, KeyError):
+            return self._first_ts
+
+    def append(self, record):
+        """Buffers one record as a compact JSON line and returns its logged_at stamp."""
+        with self._lock:
+            now = time.time()
+            if self._should_rotate(now):
+                self.rotate()
+            record = dict(record, logged_at=now)
+            line = (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode()
+            offset = self._size + self._buffered_bytes
+            if self._last_indexed is None or offset - self._last_indexed >= self.index_every:
+                self._index_buffer.append(f"{now:.6f} {offset}\n")
+                self._last_indexed = offset
+            if self._first_ts is None:
+                self._first_ts = now
+            self._last_ts = now
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            if (self._buffered_bytes >= self.flush_bytes
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+            return now
+
+    def flush(self, sync=False):
+        """Writes buffered records; fsyncs if sync or fsync_interval has passed since the last fsync."""
+        with self._lock:
+            if self._buffer:
+                self._file.write(b"".join(self._buffer))
+                self._file.flush()
+                # the index never points past data that reached the file
+                self._index_file.write("".join(self._index_buffer))
+                self._index_file.flush()
+                self._size += self._buffered_bytes
+                self._buffer, self._buffered_bytes, self._index_buffer = [], 0, []
+            self._last_flush = time.monotonic()
+            if sync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                os.fsync(self._index_file.fileno())
+                self._last_fsync = time.monotonic()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self.flush()
+
+    def _should_rotate(self, now):
+        if self._first_ts is None:
+            return False
+        if self._size + self._buffered_bytes >= self.max_bytes:
+            return True
+        return self.rotate_daily and _day(now) != _day(self._first_ts)
+
+    def manifest(self):
+        """Returns the closed segments, oldest first: [{"file", "index", "first_ts", "last_ts", "bytes"}]."""
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE), "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+
+    def rotate(self):
+        """Closes the active segment, compresses it and starts a new one."""
+        with self._lock:
+            self.flush(sync=True)
+            if self._first_ts is None:
+                return None
+            self._file.close()
+            self._index_file.close()
+
+            manifest = self.manifest()
+            stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(self._first_ts))
+            segment = f"{self.name}-{stamp}-{len(manifest):05d}.jsonl.gz"
+            # one gzip member per indexed block, so readers can seek to a block without decompressing before it
+            timestamps, offsets = _read_index(self.index_path)
+            boundaries = sorted(set([0] + offsets + [self._size]))
+            members = []
+            with open(self.path, "rb") as source, open(os.path.join(self.directory, segment + ".tmp"), "wb") as target:
+                for begin, end in zip(boundaries, boundaries[1:]):
+                    members.append((begin, target.tell()))
+                    target.write(gzip.compress(source.read(end - begin)))
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(os.path.join(self.directory, segment + ".tmp"), os.path.join(self.directory, segment))
+            # the closed segment's index points at member starts in the compressed file
+            compressed = dict(members)
+            atomic_write(os.path.join(self.directory, segment + ".idx"),
+                         "".join(f"{ts:.6f} {compressed[offset]}\n" for ts, offset in zip(timestamps, offsets)).encode())
+            os.remove(self.index_path)
+
+            entry = {
+                "file": segment,
+                "index": segment + ".idx",
+                "first_ts": self._first_ts,
+                "last_ts": self._last_ts,
+                "bytes": self._size,
+            }
+            manifest.append(entry)
+            atomic_write(os.path.join(self.directory, MANIFEST_FILE), json.dumps(manifest, indent=2).encode())
+            os.remove(self.path)
+            self._open_segment()
+            return entry
+
+    def _segments(self):
+        for entry in self.manifest():
+            yield (os.path.join(self.directory, entry["file"]), os.path.join(self.directory, entry["index"]),
+                   entry["first_ts"], entry["last_ts"])
+        if self._first_ts is not None:
+            yield self.path, self.index_path, self._first_ts, self._last_ts
+
+    def read(self, start=None, end=None):
+        """Yields the records logged between start and end (epoch seconds, inclusive), oldest first."""
+        with self._lock:
+            self.flush()
+            segments = list(self._segments())
+        for path, index_path, first_ts, last_ts in segments:
+            if (start is not None and last_ts < start) or (end is not None and first_ts > end):
+                continue
+            timestamps, offsets = _read_index(index_path)
+            position = bisect.bisect_right(timestamps, start) - 1 if start is not None else -1
+            offset = offsets[position] if position >= 0 else 0
+            with open(path, "rb") as raw:
+                raw.seek(offset)
+                # offsets in a closed segment are member starts; decompression begins there
+                file = gzip.GzipFile(fileobj=raw, mode="rb") if path.endswith(".gz") else raw
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    record = json.loads(line)
+                    if start is not None and record["logged_at"] < start:
+                        continue
+                    if end is not None and record["logged_at"] > end:
+                        return
+                    yield record
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join()
+        with self._lock:
+            self.flush(sync=True)
+            self._file.close()
+            self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+from cookie_vault import atomic_write
+from dom_waits import wait_for_visible
+from page_state import has_error, probe_page_state
+
+ROUTE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "route_cache.json")
+
+# values larger than this are app bundles or caches, not navigation state
+MAX_VALUE_LENGTH = 100000
+
+CAPTURE_SCRIPT = """
+const limit = arguments[0];
+function dump(storage) {
+    const items = {};
+    for (let i = 0; i < storage.length; i++) {
+        const key = storage.key(i);
+        const value = storage.getItem(key);
+        if (value !== null && value.length <= limit) {
+            items[key] = value;
+        }
+    }
+    return items;
+}
+return {
+    url: location.href,
+    origin: location.origin,
+    sessionStorage: dump(sessionStorage),
+    localStorage: dump(localStorage),
+};
+"""
+
+# seeds storage on the route's origin before the app's own scripts run; existing keys win
+SEED_SCRIPT = """
+(function (origin, session, local) {
+    if (location.origin !== origin) {
+        return;
+    }
+    [[sessionStorage, session], [localStorage, local]].forEach(function (pair) {
+        Object.keys(pair[1]).forEach(function (key) {
+            if (pair[0].getItem(key) === null) {
+                pair[0].setItem(key, pair[1][key]);
+            }
+        });
+    });
+})(%s, %s, %s);
+"""
+
+
+class RouteCache:
+    """Remembers where a click-through ended up so later runs can deep-link there.
+
+    A route is the URL plus the sessionStorage/localStorage of its origin,
+    recorded once the route's validation element is visible. A deep link
+    that fails validation counts against the route; after max_failures in a
+    row it is not tried again until a full click-through records it anew or
+    retry_after seconds pass. One cache can be shared by concurrent runs.
+    """
+
+    def __init__(self, filepath=ROUTE_CACHE_FILE, max_failures=3, retry_after=24 * 3600):
+        self.filepath = filepath
+        self.max_failures = max_failures
+        self.retry_after = retry_after
+        self._lock = threading.RLock()
+        try:
+            with open(filepath, "r") as file:
+                self.routes = json.load(file)
+        except FileNotFoundError:
+            self.routes = {}
+
+    def save(self):
+        with self._lock:
+            atomic_write(self.filepath, json.dumps(self.routes, indent=2).encode())
+
+    def usable(self, name, now=None):
+        with self._lock:
+            route = self.routes.get(name)
+            if route is None:
+                return False
+            if route["failures"] < self.max_failures:
+                return True
+            return (now or time.time()) - route["failed_at"] >= self.retry_after
+
+    def record(self, driver, name):
+        """Stores the driver's current URL and Web Storage as route name.
+
+        Re-recording the URL a deep link already failed on keeps its failure
+        count, so a route that can't be deep-linked backs off instead of
+        being retried after every click-through.
+        """
+        state = driver.execute_script(CAPTURE_SCRIPT, MAX_VALUE_LENGTH)
+        with self._lock:
+            previous = self.routes.get(name)
+            if previous is not None and previous["url"] == state["url"]:
+                failures, failed_at = previous["failures"], previous["failed_at"]
+            else:
+                failures, failed_at = 0, None
+            self.routes[name] = {**state, "recorded_at": time.time(), "failures": failures, "failed_at": failed_at}
+            self.save()
+            return self.routes[name]
+
+    def navigate(self, driver, name, validate, timeout=10):
+        """Deep-links to route name and returns True if validate (a locator) shows up without a portal error."""
+        with self._lock:
+            route = dict(self.routes[name])
+        script_id = None
+        if route["sessionStorage"] or route["localStorage"]:
+            source = SEED_SCRIPT % (json.dumps(route["origin"]), json.dumps(route["sessionStorage"]),
+                                    json.dumps(route["localStorage"]))
+            script_id = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})["identifier"]
+        try:
+            driver.get(route["url"])
+            wait_for_visible(driver, validate, timeout)
+            ok = not has_error(probe_page_state(driver))
+        except TimeoutException:
+            ok = False
+        finally:
+            if script_id is not None:
+                driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": script_id})
+        with self._lock:
+            route = self.routes.setdefault(name, route)
+            if ok:
+                route["failures"] = 0
+            else:
+                route["failures"] += 1
+                route["failed_at"] = time.time()
+            self.save()
+        return ok
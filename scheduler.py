@@ -0,0 +1,255 @@
+import argparse
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from check_website_status import ProbeCache, StatusChecker, load_endpoints, print_results
+from cookie_vault import CookieVault
+from latency_stats import LatencyStats, stats_file
+from result_log import ResultLog
+from route_cache import RouteCache
+from session_keeper import SessionKeeper
+
+
+class Tier:
+    """One kind of check and the cadence it runs at.
+
+    run() returns (ok, changed, detail). A tier runs every interval seconds
+    (spread by +/- jitter as a fraction), at most max_concurrent at a time,
+    and after consecutive failures waits interval * 2^failures, capped at
+    max_backoff. When a run fails or reports a change, the tiers named in
+    escalate are made due immediately, but no sooner than their
+    min_interval after their previous start.
+    """
+
+    def __init__(self, name, run, interval, jitter=0.1, max_concurrent=1, max_backoff=None, min_interval=0,
+                 escalate=()):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.jitter = jitter
+        self.max_concurrent = max_concurrent
+        self.max_backoff = max_backoff or interval * 8
+        self.min_interval = min_interval
+        self.escalate = tuple(escalate)
+        self.failures = 0
+        self.running = 0
+        self.last_started = None
+
+    def next_delay(self):
+        delay = min(self.interval * 2 ** self.failures, max(self.interval, self.max_backoff))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class Scheduler:
+    """Runs tiers on their own cadences from one thread pool until stopped.
+
+    Every tier run is appended to result_log as a {"kind": "tier"} record.
+    """
+
+    def __init__(self, tiers, result_log, max_workers=4):
+        self.tiers = {tier.name: tier for tier in tiers}
+        self.result_log = result_log
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tier")
+        self._due = []
+        self._lock = threading.Condition()
+        self._stopped = False
+        now = time.monotonic()
+        with self._lock:
+            for tier in tiers:
+                # spread first runs so tiers sharing a cadence don't fire together
+                self._schedule(tier, now + random.uniform(0, tier.jitter * tier.interval))
+
+    def _schedule(self, tier, at):
+        heapq.heappush(self._due, (at, tier.name))
+        self._lock.notify()
+
+    def escalate(self, name):
+        """Makes a tier due now, subject to its min_interval."""
+        with self._lock:
+            tier = self.tiers[name]
+            at = time.monotonic()
+            if tier.last_started is not None:
+                at = max(at, tier.last_started + tier.min_interval)
+            if any(due_name == name and due_at <= at for due_at, due_name in self._due):
+                return
+            self._schedule(tier, at)
+
+    def run_forever(self):
+        with self._lock:
+            while not self._stopped:
+                if not self._due:
+                    self._lock.wait()
+                    continue
+                at, name = self._due[0]
+                delay = at - time.monotonic()
+                if delay > 0:
+                    self._lock.wait(delay)
+                    continue
+                heapq.heappop(self._due)
+                tier = self.tiers[name]
+                # an escalation can leave a second entry queued for the same tier
+                self._due = [(due_at, due_name) for due_at, due_name in self._due if due_name != name]
+                heapq.heapify(self._due)
+                if tier.running >= tier.max_concurrent:
+                    self._schedule(tier, time.monotonic() + tier.interval)
+                    continue
+                tier.running += 1
+                tier.last_started = time.monotonic()
+                self._executor.submit(self._run, tier)
+
+    def _run(self, tier):
+        started = time.perf_counter()
+        try:
+            ok, changed, detail = tier.run()
+        except Exception as e:
+            ok, changed, detail = False, False, {"error": f"{type(e).__name__}: {e}"}
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.result_log.append({"kind": "tier", "tier": tier.name, "ok": ok, "changed": changed,
+                                "duration_ms": duration_ms, "failures": tier.failures, "detail": detail})
+        print(f"[{time.strftime('%H:%M:%S')}] {tier.name}: {'OK' if ok else 'FAIL'}"
+              f"{' (changed)' if changed else ''} in {duration_ms:.0f} ms")
+        with self._lock:
+            tier.running -= 1
+            tier.failures = 0 if ok else tier.failures + 1
+            self._schedule(tier, time.monotonic() + tier.next_delay())
+        if not ok or changed:
+            for name in tier.escalate:
+                self.escalate(name)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._lock.notify()
+        self._executor.shutdown(wait=True)
+
+
+def probe_tier(endpoints, stats, stats_lock, flow):
+    """Returns a Tier.run that sweeps endpoints with a StatusChecker and records each result."""
+    checker = StatusChecker(endpoints, cache=ProbeCache())
+
+    def run():
+        results = checker.sweep()
+        print_results(results)
+        with stats_lock:
+            for result in results:
+                stats.ingest_probe(result, flow)
+        failed = [result["name"] for result in results if not result["ok"]]
+        changed = [result["name"] for result in results if result.get("change") == "changed"]
+        return not failed, bool(changed), {"failed": failed, "changed": changed}
+
+    return run
+
+
+def session_tier(endpoints, stats, stats_lock, keeper):
+    """Returns a Tier.run that renews the saved session and checks the portal still accepts it."""
+    def run():
+        report = keeper.refresh()
+        if not report["ok"]:
+            return False, False, report
+        # a fresh checker picks up the cookies the keeper just saved
+        checker = StatusChecker(endpoints, vault=keeper.vault, jar=keeper.name)
+        try:
+            results = checker.sweep()
+        finally:
+            checker.close()
+        with stats_lock:
+            for result in results:
+                stats.ingest_probe(result, "session")
+        rejected = [result["name"] for result in results if not result["ok"]]
+        return not rejected, False, {"rejected": rejected, "renewed": report["renewed"],
+                                     "time_left": report["time_left"]}
+
+    return run
+
+
+def browser_tier(pool, vault, result_log, stats, stats_lock, routes=None, full_path_every=1):
+    """Returns a Tier.run that runs check_form_submission on a pooled browser.
+
+    With a RouteCache, runs deep-link to the compose view except every
+    full_path_every-th run, which clicks through to keep navigation covered.
+    """
+    from check_form_submission import check_form_submission
+    from instrumentation import RunTimeline
+
+    runs = itertools.count()
+
+    def run():
+        if vault.is_expired():
+            return False, False, {"error": "saved session expired; skipping browser check"}
+        deep_link = routes is not None and next(runs) % full_path_every != 0
+        timeline = RunTimeline("appeals_form" + ("-deep-link" if deep_link else ""))
+        with pool.lease(timeout=600) as driver:
+            ok = check_form_submission(driver, quit_driver=False, timeline=timeline, routes=routes,
+                                       deep_link=deep_link)
+        timeline.export(result_log)
+        with stats_lock:
+            stats.ingest_run(timeline.to_record())
+        return ok, False, {"run_id": timeline.run_id, "deep_link": deep_link}
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the portal checks continuously in tiers.")
+    parser.add_argument("--probe-interval", type=float, default=30, help="seconds between public HTTP probes")
+    parser.add_argument("--session-interval", type=float, default=300,
+                        help="seconds between session renewals and checks")
+    parser.add_argument("--browser-interval", type=float, default=1800, help="seconds between browser checks")
+    parser.add_argument("--browser-min-interval", type=float, default=300,
+                        help="minimum seconds between escalated browser checks")
+    parser.add_argument("--browsers", type=int, default=1, help="browsers kept warm for the browser tier")
+    parser.add_argument("--full-path-every", type=int, default=6,
+                        help="click through the menus on every Nth browser check and deep-link otherwise")
+    args = parser.parse_args()
+
+    from browser_pool import BrowserPool, cookie_login
+    from check_form_submission import filter_cookies
+
+    endpoints = load_endpoints()
+    vault = CookieVault()
+    keeper = SessionKeeper(vault, select=filter_cookies)
+    stats = LatencyStats.load(stats_file(role="scheduler"))
+    stats_lock = threading.Lock()
+    result_log = ResultLog()
+    pool = BrowserPool(size=args.browsers, login=cookie_login(vault), max_runs=20)
+
+    public = [endpoint for endpoint in endpoints if not endpoint.get("auth")]
+    authenticated = [endpoint for endpoint in endpoints if endpoint.get("auth")]
+    tiers = [
+        Tier("probe", probe_tier(public, stats, stats_lock, "status"), args.probe_interval,
+             max_backoff=args.probe_interval * 4, escalate=("session", "browser")),
+        Tier("session", session_tier(authenticated, stats, stats_lock, keeper), args.session_interval,
+             escalate=("browser",)),
+        Tier("browser", browser_tier(pool, vault, result_log, stats, stats_lock, RouteCache(), args.full_path_every),
+             args.browser_interval,
+             max_concurrent=args.browsers, min_interval=args.browser_min_interval),
+    ]
+    scheduler = Scheduler(tiers, result_log, max_workers=2 + args.browsers)
+
+    def save_stats():
+        while not stopped.wait(60):
+            with stats_lock:
+                stats.save(stats_file(role="scheduler"))
+
+    stopped = threading.Event()
+    threading.Thread(target=save_stats, daemon=True).start()
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        stopped.set()
+        scheduler.stop()
+        pool.close()
+        keeper.close()
+        with stats_lock:
+            stats.save(stats_file(role="scheduler"))
+        result_log.close()
+
+
+if __name__ == "__main__":
+    main()
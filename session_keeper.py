@@ -0,0 +1,133 @@
+import argparse
+import time
+
+import requests
+
+from check_website_status import add_vault_cookies, make_session
+from cookie_vault import CookieVault
+
+KEEPALIVE_URL = "https://membersecure.anthem.com/member/find-care"
+
+
+def _cookie_key(cookie):
+    return cookie["name"], (cookie.get("domain") or "").lstrip("."), cookie.get("path", "/")
+
+
+def _from_jar(cookie):
+    """Converts a requests cookie into a WebDriver-style dict CookieVault.save understands."""
+    return {
+        "name": cookie.name,
+        "value": cookie.value,
+        "domain": cookie.domain,
+        "path": cookie.path,
+        "secure": cookie.secure,
+        "httpOnly": cookie.has_nonstandard_attr("HttpOnly") or cookie.has_nonstandard_attr("httponly"),
+        "expires": cookie.expires,
+    }
+
+
+def _expires(cookie):
+    # the jar keeps whole seconds while the vault keeps CDP's float
+    return int(cookie["expires"]) if cookie.get("expires") else None
+
+
+class SessionKeeper:
+    """Keeps a saved portal session alive over plain HTTP.
+
+    Each refresh() requests an authenticated page with the vault's cookies,
+    so the portal resets its idle timeout, then writes any cookies it
+    renewed back into the jar. Only a save restamps the jar and moves its
+    expected expiry forward; a 200 that renews nothing leaves the expiry
+    where it was, so a keep-alive URL that answers without auth can't hide
+    a dead session. A redirect or 401/403 means the session is gone and
+    someone has to log in again.
+    """
+
+    def __init__(self, vault=None, name="default", url=KEEPALIVE_URL, select=None, timeout=10):
+        self.vault = vault or CookieVault()
+        self.name = name
+        self.url = url
+        self.select = select
+        self.timeout = timeout
+        self.session = None
+
+    def _open(self):
+        # start from the jar on disk, which a browser login may have replaced
+        if self.session is not None:
+            self.session.close()
+        self.session = make_session(pool_size=1)
+        add_vault_cookies(self.session, self.vault, self.name)
+
+    def refresh(self):
+        """Hits the keep-alive URL once and returns {"ok", "status", "renewed", "expires_at", "time_left"}."""
+        if not self.vault.exists(self.name):
+            return {"ok": False, "status": None, "error": "no saved session", "renewed": [], **self.remaining()}
+        self._open()
+        try:
+            response = self.session.get(self.url, timeout=self.timeout, allow_redirects=False)
+            response.close()
+        except requests.RequestException as e:
+            # a network failure says nothing about the session; keep the jar as it is
+            return {"ok": False, "status": None, "error": str(e), "renewed": [], **self.remaining()}
+        if response.status_code != 200:
+            return {"ok": False, "status": response.status_code, "error": "session rejected",
+                    "renewed": [], **self.remaining()}
+
+        cookies = {_cookie_key(cookie): cookie for cookie in self.vault.load(self.name)}
+        renewed = []
+        for jar_cookie in self.session.cookies:
+            cookie = _from_jar(jar_cookie)
+            previous = cookies.get(_cookie_key(cookie))
+            if previous is None or previous["value"] != cookie["value"] or _expires(previous) != _expires(cookie):
+                if previous is not None:
+                    # keep attributes the requests jar does not track or reports wrongly for cookies it was given
+                    cookie = {**previous, **{k: v for k, v in cookie.items() if v is not None and k != "httpOnly"}}
+                cookies[_cookie_key(cookie)] = cookie
+                renewed.append(cookie["name"])
+        if renewed:
+            self.vault.save(list(cookies.values()), self.name, select=self.select)
+        return {"ok": True, "status": response.status_code, "renewed": renewed, **self.remaining()}
+
+    def remaining(self):
+        expires_at = self.vault.expires_at(self.name)
+        return {
+            "expires_at": expires_at,
+            "time_left": expires_at - time.time() if expires_at is not None else None,
+        }
+
+    def run_forever(self, interval=300):
+        while True:
+            report = self.refresh()
+            left = report["time_left"]
+            left = f"{left / 60:.0f} min left" if left is not None else "no session"
+            renewed = f", renewed {', '.join(report['renewed'])}" if report["renewed"] else ""
+            state = "alive" if report["ok"] else f"FAILED ({report.get('error')})"
+            print(f"[{time.strftime('%H:%M:%S')}] session {state}: {left}{renewed}")
+            time.sleep(interval)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the saved portal session alive without a browser.")
+    parser.add_argument("--jar", default="default", help="cookie vault jar to maintain")
+    parser.add_argument("--url", default=KEEPALIVE_URL, help="authenticated page to request")
+    parser.add_argument("--interval", type=float, default=300, help="seconds between refreshes")
+    args = parser.parse_args()
+
+    from check_form_submission import filter_cookies
+
+    keeper = SessionKeeper(name=args.jar, url=args.url, select=filter_cookies)
+    try:
+        keeper.run_forever(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        keeper.close()
+
+
+if __name__ == "__main__":
+    main()
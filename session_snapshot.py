@@ -0,0 +1,264 @@
+import fnmatch
+import json
+import os
+import time
+import zlib
+
+from selenium.common.exceptions import WebDriverException
+
+from cookie_vault import CookieVault, atomic_write, to_cdp_cookie
+from instrumentation import span
+from route_cache import MAX_VALUE_LENGTH, SEED_SCRIPT
+
+# {database glob: [object store globs]} captured by default
+DEFAULT_STORES = {"*": ["*"]}
+
+# stores bigger than this are caches the app can rebuild, not session state
+MAX_RECORDS = 1000
+
+# reads whole records by value; CDP's IndexedDB.requestData only returns object previews
+EXPORT_SCRIPT = """
+const databases = arguments[0], limit = arguments[1], done = arguments[arguments.length - 1];
+function exportStore(db, name) {
+    return new Promise(function (resolve) {
+        const tx = db.transaction(name, "readonly");
+        const keys = tx.objectStore(name).getAllKeys(null, limit);
+        const values = tx.objectStore(name).getAll(null, limit);
+        tx.oncomplete = function () {
+            const records = [];
+            keys.result.forEach(function (key, i) {
+                try {
+                    records.push(JSON.parse(JSON.stringify([key, values.result[i]])));
+                } catch (e) {
+                    // not JSON-serializable; the app has to rebuild it
+                }
+            });
+            resolve(records);
+        };
+        tx.onerror = tx.onabort = function () { resolve(null); };
+    });
+}
+function exportDatabase(spec) {
+    return new Promise(function (resolve) {
+        const request = indexedDB.open(spec.name);
+        request.onerror = function () { resolve(null); };
+        request.onsuccess = async function () {
+            const db = request.result, stores = {};
+            for (const name of spec.stores) {
+                stores[name] = await exportStore(db, name);
+            }
+            db.close();
+            resolve(stores);
+        };
+    });
+}
+(async function () {
+    const result = {};
+    for (const spec of databases) {
+        result[spec.name] = await exportDatabase(spec);
+    }
+    done(result);
+})();
+"""
+
+# creates and fills databases that don't exist yet; an existing database of any version wins
+IDB_SEED_SCRIPT = """
+(function (origin, databases) {
+    if (location.origin !== origin) {
+        return;
+    }
+    databases.forEach(function (spec) {
+        const request = indexedDB.open(spec.name, spec.version);
+        request.onupgradeneeded = function (event) {
+            if (event.oldVersion !== 0) {
+                request.transaction.abort();
+                return;
+            }
+            const db = request.result;
+            spec.stores.forEach(function (store) {
+                const objectStore = db.createObjectStore(store.name, {keyPath: store.keyPath, autoIncrement: store.autoIncrement});
+                store.indexes.forEach(function (index) {
+                    objectStore.createIndex(index.name, index.keyPath, {unique: index.unique, multiEntry: index.multiEntry});
+                });
+                store.records.forEach(function (record) {
+                    if (store.keyPath === null) {
+                        objectStore.put(record[1], record[0]);
+                    } else {
+                        objectStore.put(record[1]);
+                    }
+                });
+            });
+        };
+        request.onsuccess = function () { request.result.close(); };
+        request.onerror = function (event) { event.preventDefault(); };
+    });
+})(%s, %s);
+"""
+
+
+def _key_path(key_path):
+    """Converts a CDP IndexedDB.KeyPath into the value createObjectStore/createIndex take."""
+    if key_path["type"] == "string":
+        return key_path["string"]
+    if key_path["type"] == "array":
+        return key_path["array"]
+    return None
+
+
+def _selected(name, patterns):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+class SessionSnapshots:
+    """Stores a session's cookies, Web Storage and IndexedDB together so it can be restored whole.
+
+    A snapshot is one zlib-compressed JSON file of Web Storage and
+    IndexedDB next to the cookie vault's jars. The cookies live only in
+    the vault jar of the same name, so the vault's expiry index tells
+    whether the snapshot is still worth restoring and the session keeper's
+    renewals are what gets restored. Restoring happens before the first
+    navigation: cookies through Network.setCookies, storage through a
+    one-shot script that runs ahead of the app's own scripts on each
+    captured origin, so the app starts authenticated and hydrated instead
+    of re-bootstrapping.
+    """
+
+    def __init__(self, vault=None, directory=None):
+        self.vault = vault or CookieVault()
+        self.directory = directory or self.vault.directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.snapshot")
+
+    def exists(self, name="default"):
+        return os.path.exists(self._path(name)) and self.vault.exists(name)
+
+    def usable(self, name="default", margin=60):
+        """True if the snapshot exists and its session is not about to expire."""
+        return self.exists(name) and not self.vault.is_expired(name, margin)
+
+    def load(self, name="default"):
+        with open(self._path(name), "rb") as file:
+            return json.loads(zlib.decompress(file.read()))
+
+    def cookies(self, driver):
+        """Reads every cookie of the browser as Network.CookieParam dicts."""
+        try:
+            cookies = driver.execute_cdp_cmd("Storage.getCookies", {})["cookies"]
+        except WebDriverException:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        return [to_cdp_cookie(cookie) for cookie in cookies]
+
+    def capture(self, driver, origins=None, stores=DEFAULT_STORES, max_records=MAX_RECORDS):
+        """Reads the storage of origins (default: the current page's origin).
+
+        stores maps database globs to object store globs; IndexedDB is read
+        for the current page's origin only, since the records are exported
+        by a script running in the page.
+        """
+        page_origin = driver.execute_script("return location.origin;")
+        origins = origins or [page_origin]
+        snapshot = {"saved_at": time.time(), "url": driver.current_url, "origins": {}}
+        driver.execute_cdp_cmd("DOMStorage.enable", {})
+        try:
+            for origin in origins:
+                snapshot["origins"][origin] = {
+                    "sessionStorage": self._web_storage(driver, origin, False),
+                    "localStorage": self._web_storage(driver, origin, True),
+                    "indexedDB": self._indexed_db(driver, origin, stores, max_records) if origin == page_origin else [],
+                }
+        finally:
+            driver.execute_cdp_cmd("DOMStorage.disable", {})
+        return snapshot
+
+    def _web_storage(self, driver, origin, local):
+        try:
+            entries = driver.execute_cdp_cmd("DOMStorage.getDOMStorageItems", {
+                "storageId": {"securityOrigin": origin, "isLocalStorage": local}})["entries"]
+        except WebDriverException:
+            return {}
+        return {key: value for key, value in entries if len(value) <= MAX_VALUE_LENGTH}
+
+    def _indexed_db(self, driver, origin, stores, max_records):
+        if not stores:
+            return []
+        names = driver.execute_cdp_cmd("IndexedDB.requestDatabaseNames", {"securityOrigin": origin})["databaseNames"]
+        databases = []
+        for name in names:
+            patterns = [store for pattern, selected in stores.items() if fnmatch.fnmatchcase(name, pattern)
+                        for store in selected]
+            if not patterns:
+                continue
+            schema = driver.execute_cdp_cmd("IndexedDB.requestDatabase", {
+                "securityOrigin": origin, "databaseName": name})["databaseWithObjectStores"]
+            databases.append({
+                "name": name,
+                "version": schema["version"],
+                "stores": [{
+                    "name": store["name"],
+                    "keyPath": _key_path(store["keyPath"]),
+                    "autoIncrement": store["autoIncrement"],
+                    "indexes": [{"name": index["name"], "keyPath": _key_path(index["keyPath"]),
+                                 "unique": index["unique"], "multiEntry": index["multiEntry"]}
+                                for index in store["indexes"]],
+                } for store in schema["objectStores"] if _selected(store["name"], patterns)],
+            })
+        if not databases:
+            return []
+        records = driver.execute_async_script(
+            EXPORT_SCRIPT, [{"name": db["name"], "stores": [store["name"] for store in db["stores"]]}
+                            for db in databases], max_records)
+        for db in databases:
+            exported = records.get(db["name"]) or {}
+            for store in db["stores"]:
+                store["records"] = exported.get(store["name"]) or []
+            # a store that couldn't be read would be recreated empty; leave the database to the app instead
+            if any(exported.get(store["name"]) is None for store in db["stores"]):
+                db["stores"] = None
+        return [db for db in databases if db["stores"]]
+
+    def save(self, driver, name="default", select=None, **options):
+        """Captures the session and stores it as name; select(cookies) picks the cookies that count for expiry."""
+        with span("snapshot_save", jar=name):
+            snapshot = self.capture(driver, **options)
+            payload = json.dumps(snapshot, separators=(",", ":")).encode()
+            atomic_write(self._path(name), zlib.compress(payload, 9))
+            entry = self.vault.save(self.cookies(driver), name, select)
+        return {**entry, "bytes": len(payload), "origins": len(snapshot["origins"])}
+
+    def restore(self, driver, name="default", select=None):
+        """Installs the snapshot ahead of the next navigation; returns the seed script's id, or None.
+
+        Cookies come from the vault jar, which the session keeper renews;
+        select(cookies) picks the ones to restore, as in CookieVault.restore.
+        Pass the id to Page.removeScriptToEvaluateOnNewDocument once the page
+        has loaded, or use open(), so later navigations don't seed again.
+        """
+        snapshot = self.load(name)
+        now = time.time()
+        cookies = [cookie for cookie in self.vault.load(name) if cookie.get("expires", now + 1) > now]
+        if select:
+            cookies = select(cookies)
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        sources = []
+        for origin, state in snapshot["origins"].items():
+            if state["sessionStorage"] or state["localStorage"]:
+                sources.append(SEED_SCRIPT % (json.dumps(origin), json.dumps(state["sessionStorage"]),
+                                              json.dumps(state["localStorage"])))
+            if state["indexedDB"]:
+                sources.append(IDB_SEED_SCRIPT % (json.dumps(origin), json.dumps(state["indexedDB"])))
+        if not sources:
+            return None
+        return driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                                      {"source": "\n".join(sources)})["identifier"]
+
+    def open(self, driver, url=None, name="default", select=None):
+        """Restores the snapshot and navigates to url (default: the page it was captured on) in one load."""
+        url = url or self.load(name)["url"]
+        with span("snapshot_restore", jar=name):
+            script_id = self.restore(driver, name, select)
+            try:
+                driver.get(url)
+            finally:
+                if script_id is not None:
+                    driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": script_id})
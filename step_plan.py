@@ -0,0 +1,439 @@
+import json
+import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+
+from dom_waits import INSTALL_SCRIPT, ensure_script_timeout, wait_for_dom_quiet, wait_for_visible
+from form_fill import SET_VALUE_JS
+from instrumentation import span
+from network_tracker import NetworkTracker
+from page_metrics import collect_page_metrics, print_page_metrics
+from page_state import ERROR_CONTAINER_SELECTOR, ERROR_MESSAGE, has_error, locator_target, probe_page_state
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+PLANS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plans")
+APPEALS_FORM_PLAN = os.path.join(PLANS_DIR, "appeals_form.json")
+
+ACTIONS = {"click", "fill", "select", "wait", "assert", "intercept", "measure", "route"}
+
+# timeline span name for each compiled op
+SPAN_NAMES = {"batch": "batch", "assert": "assert", "quiet": "wait", "await_intercept": "intercept",
+              "measure": "measure", "network_idle": "network", "await_response": "network", "route": "route"}
+
+# ops that need a NetworkTracker
+NETWORK_OPS = {"network_idle", "await_response"}
+
+# Runs a batch of DOM-only steps in one async script call. Each step waits
+# for its element through the dom_waits observer, optionally for the DOM to
+# settle, and then acts; the batch stops at the first failure.
+BATCH_SCRIPT = INSTALL_SCRIPT + SET_VALUE_JS + """
+const steps = arguments[0];
+const errorSelector = arguments[1];
+const errorMessage = arguments[2];
+const done = arguments[arguments.length - 1];
+const waits = window.__domWaits;
+
+function portalError() {
+    const error = document.querySelector(errorSelector);
+    return !!error && (error.innerText || error.textContent || "").indexOf(errorMessage) !== -1;
+}
+
+function settle(ms, cap, next) {
+    if (!ms) {
+        return next();
+    }
+    let timer;
+    const deadline = setTimeout(function () { waits.waiters.delete(waiter); clearTimeout(timer); next(); }, cap);
+    const waiter = {check: function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            if (waits.waiters.delete(waiter)) {
+                clearTimeout(deadline);
+                next();
+            }
+        }, ms);
+    }};
+    waits.waiters.add(waiter);
+    waiter.check();
+}
+
+function run(i) {
+    if (i >= steps.length) {
+        return done({ok: true, completed: i});
+    }
+    if (portalError()) {
+        return done({ok: false, failed: i, reason: "portal error"});
+    }
+    const step = steps[i];
+    waits.register(function () {
+        const element = waits.find(step.target);
+        return step.visible ? (waits.visible(element) ? element : null) : element;
+    }, step.timeoutMs, function (result) {
+        if (!result.ok) {
+            return done({ok: false, failed: i, reason: "timeout"});
+        }
+        settle(step.settleMs, 2000, function () {
+            try {
+                if (step.kind === "click") {
+                    result.value.click();
+                } else if (step.kind === "fill") {
+                    setValue(result.value, step.value);
+                }
+            } catch (e) {
+                return done({ok: false, failed: i, reason: String(e)});
+            }
+            // answer before a navigating click can unload the page
+            if (i + 1 >= steps.length) {
+                return done({ok: true, completed: steps.length});
+            }
+            setTimeout(function () { run(i + 1); }, 0);
+        });
+    });
+}
+
+run(0);
+"""
+
+
+class PlanError(ValueError):
+    """Raised when a step plan is malformed."""
+
+
+def load_plan(path):
+    """Loads a step plan from a JSON or YAML file."""
+    with open(path, "r") as file:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise PlanError("PyYAML is required to load YAML step plans.")
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+def _locator(step, key="id"):
+    if key in step:
+        return locator_target(By.ID, step[key])
+    if "css" in step:
+        return locator_target(By.CSS_SELECTOR, step["css"])
+    raise PlanError(f"Step {step} has no '{key}' or 'css' locator.")
+
+
+def _describe(step):
+    return step.get("id") or step.get("css") or step.get("option") or step.get("url") or step["action"]
+
+
+def _expand(step, defaults):
+    """Turns one plan step into the primitive DOM actions it is made of."""
+    timeout_ms = int(step.get("timeout", defaults.get("timeout", 10)) * 1000)
+    settle_ms = step.get("settle_ms", defaults.get("settle_ms", 0))
+    action = step["action"]
+    if action == "click":
+        return [{
+            "kind": "click",
+            "target": _locator(step),
+            "timeoutMs": timeout_ms,
+            "settleMs": settle_ms,
+            "visible": True,
+            "name": _describe(step),
+        }], step.get("round_trip", True)
+    if action == "fill":
+        if "value" not in step:
+            raise PlanError(f"Fill step {_describe(step)} has no value.")
+        return [{
+            "kind": "fill",
+            "target": _locator(step),
+            "value": step["value"],
+            "timeoutMs": timeout_ms,
+            "settleMs": settle_ms,
+            "visible": True,
+            "name": _describe(step),
+        }], False
+    if action == "select":
+        # an Ant Design select is a click on the trigger and a click on the option
+        return [
+            {
+                "kind": "click",
+                "target": _locator(step, "button"),
+                "timeoutMs": timeout_ms,
+                "settleMs": settle_ms,
+                "visible": True,
+                "name": step["button"],
+            },
+            {
+                "kind": "click",
+                "target": _locator(step, "option"),
+                "timeoutMs": timeout_ms,
+                "settleMs": settle_ms,
+                "visible": True,
+                "name": step["option"],
+            },
+        ], step.get("round_trip", False)
+    if action == "wait" and "quiet_ms" not in step:
+        return [{
+            "kind": "wait",
+            "target": _locator(step),
+            "timeoutMs": timeout_ms,
+            "settleMs": 0,
+            "visible": step.get("state", "present") == "visible",
+            "name": _describe(step),
+        }], False
+    return None, True
+
+
+def _network_waits(step, timeout):
+    """Ops for a step's await_response (URL glob) and network_idle_ms fields, in that order."""
+    waits = []
+    if "await_response" in step:
+        waits.append({"op": "await_response", "url": step["await_response"], "timeout": timeout})
+    if "network_idle_ms" in step:
+        waits.append({"op": "network_idle", "idle_ms": step["network_idle_ms"], "timeout": timeout})
+    return waits
+
+
+def compile_plan(plan):
+    """Compiles a step plan into an execution program.
+
+    Adjacent DOM-only steps are merged into a single "batch" op that runs
+    as one injected script; a step marked round_trip closes its batch, since
+    what follows depends on the server. A step with await_response or
+    network_idle_ms closes its batch too and is followed by a wait on the
+    page's XHR traffic. Locators and timeouts are resolved here so the
+    executor only issues commands.
+    """
+    if not isinstance(plan, dict) or not isinstance(plan.get("steps"), list):
+        raise PlanError("A step plan needs a 'steps' list.")
+    defaults = plan.get("defaults", {})
+    prologue = []
+    program = []
+    batch = []
+
+    def close_batch():
+        if batch:
+            program.append({
+                "op": "batch",
+                "steps": list(batch),
+                "timeout": sum(s["timeoutMs"] + s["settleMs"] for s in batch) / 1000,
+            })
+            del batch[:]
+
+    for index, step in enumerate(plan["steps"]):
+        action = step.get("action")
+        if action not in ACTIONS:
+            raise PlanError(f"Step {index} has unknown action '{action}'.")
+        timeout = step.get("timeout", defaults.get("timeout", 10))
+
+        if action == "intercept":
+            # arm interception before anything runs, await it where it was declared
+            prologue.append({"op": "intercept", "url": step["url"], "fail": step.get("fail", True)})
+            close_batch()
+            program.append({"op": "await_intercept", "url": step["url"], "timeout": timeout})
+            continue
+        if action == "assert":
+            close_batch()
+            program.append({
+                "op": "assert",
+                "no_error": step.get("no_error", True),
+                "locator": [By.ID, step["id"]] if "id" in step else ([By.CSS_SELECTOR, step["css"]] if "css" in step else None),
+                "name": _describe(step),
+            })
+            continue
+        if action == "route":
+            # a view later runs can deep-link to; validate is what proves it loaded
+            close_batch()
+            program.append({"op": "route", "name": step["name"], "validate": [By.ID, step["validate"]],
+                            "timeout": timeout})
+            continue
+        if action == "measure":
+            close_batch()
+            program.append({"op": "measure", "label": step["label"], "timeout": timeout})
+            continue
+        if action == "wait" and "quiet_ms" in step:
+            close_batch()
+            program.append({"op": "quiet", "quiet_ms": step["quiet_ms"], "timeout": timeout})
+            continue
+
+        network_waits = _network_waits(step, timeout)
+        if action != "wait" or "id" in step or "css" in step:
+            primitives, round_trip = _expand(step, defaults)
+            batch.extend(primitives)
+            if round_trip:
+                close_batch()
+        elif not network_waits:
+            raise PlanError(f"Wait step {index} has no locator, quiet_ms, network_idle_ms or await_response.")
+        if network_waits:
+            # the data a later step needs arrives over the network, not through the DOM
+            close_batch()
+            program.extend(network_waits)
+
+    close_batch()
+    return {"name": plan.get("name", "plan"), "prologue": prologue, "program": program}
+
+
+def _run_batch(driver, op):
+    ensure_script_timeout(driver, op["timeout"] + 5)
+    result = driver.execute_async_script(BATCH_SCRIPT, op["steps"], ERROR_CONTAINER_SELECTOR, ERROR_MESSAGE)
+    if result and result["ok"]:
+        for step in op["steps"]:
+            print(f"{step['kind'].capitalize()} '{step['name']}' done.")
+        return True
+    failed = op["steps"][result["failed"]] if result else None
+    name = failed["name"] if failed else "?"
+    print(f"Step '{name}' failed: {result['reason'] if result else 'no result'}")
+    return False
+
+
+def _run_assert(driver, op):
+    locator = op["locator"]
+    state = probe_page_state(driver, locator[1], locator[0]) if locator else probe_page_state(driver)
+    if op["no_error"] and has_error(state):
+        print("Error detected on page.")
+        return False
+    if locator and not state["elementPresent"]:
+        print(f"Expected element '{op['name']}' is not present.")
+        return False
+    return True
+
+
+def run_program(driver, compiled, interceptor=None, measure=True, tracker=None, routes=None, deep_link=False):
+    """Executes a compiled plan, returning True if every op succeeds.
+
+    measure=False skips the plan's page metrics collection points. Network
+    waits use tracker, or a NetworkTracker opened on the driver for the run;
+    a tracker that is not running yet is started and stopped around the run.
+    With a RouteCache, route ops reached by clicking through are recorded,
+    and deep_link=True starts from the last usable recorded route instead,
+    falling back to the full path from the current page if it fails.
+    """
+    futures = {}
+    if compiled["prologue"]:
+        if interceptor is None:
+            raise PlanError("Plan intercepts requests but no interceptor was given.")
+        for op in compiled["prologue"]:
+            futures[op["url"]] = interceptor.intercept(op["url"], fail=op["fail"])
+        interceptor.start()
+
+    run_tracker = any(op["op"] in NETWORK_OPS for op in compiled["program"]) and not (tracker and tracker.started)
+    if run_tracker:
+        tracker = (tracker or NetworkTracker.for_driver(driver)).start()
+    since = None
+    program = compiled["program"]
+    if routes is not None and deep_link:
+        program = program[_deep_link(driver, program, routes):]
+    try:
+        for op in program:
+            if op["op"] == "measure" and not measure:
+                continue
+            if tracker is not None and op["op"] not in NETWORK_OPS:
+                # responses count for a network wait only if they completed after the step before it began
+                since = tracker.mark()
+            with span(SPAN_NAMES[op["op"]], **_span_tags(op)) as record:
+                ok = _run_op(driver, op, futures, tracker, since, routes)
+                if record is not None:
+                    record["ok"] = ok
+            if not ok:
+                return False
+        return True
+    finally:
+        if run_tracker:
+            tracker.stop()
+
+
+def _deep_link(driver, program, routes):
+    """Navigates to the latest usable route in program; returns the index to resume from (0 for the full path)."""
+    start_url = driver.current_url
+    for index in range(len(program) - 1, -1, -1):
+        op = program[index]
+        if op["op"] != "route" or not routes.usable(op["name"]):
+            continue
+        with span("deep_link", route=op["name"]) as record:
+            ok = routes.navigate(driver, op["name"], tuple(op["validate"]), op["timeout"])
+            if record is not None:
+                record["ok"] = ok
+        if ok:
+            print(f"Deep-linked to '{op['name']}'.")
+            return index + 1
+        print(f"Deep link to '{op['name']}' failed; taking the full path.")
+        driver.get(start_url)
+        return 0
+    return 0
+
+
+def _span_tags(op):
+    if op["op"] == "batch":
+        return {"steps": [step["name"] for step in op["steps"]]}
+    if op["op"] in ("await_intercept", "await_response"):
+        return {"url": op["url"]}
+    if op["op"] == "network_idle":
+        return {"idle_ms": op["idle_ms"]}
+    if op["op"] == "measure":
+        return {"label": op["label"]}
+    if op["op"] == "route":
+        return {"route": op["name"]}
+    return {}
+
+
+def _run_op(driver, op, futures, tracker=None, since=None, routes=None):
+    kind = op["op"]
+    if kind == "batch":
+        return _run_batch(driver, op)
+    if kind == "assert":
+        return _run_assert(driver, op)
+    if kind == "quiet":
+        try:
+            wait_for_dom_quiet(driver, op["quiet_ms"], op["timeout"])
+        except TimeoutException:
+            print("DOM did not settle in time.")
+            return False
+        return True
+    if kind == "await_intercept":
+        try:
+            futures[op["url"]].result(timeout=op["timeout"])
+        except FutureTimeoutError:
+            print(f"No request matching '{op['url']}' detected.")
+            return False
+        return True
+    if kind == "route":
+        try:
+            wait_for_visible(driver, tuple(op["validate"]), op["timeout"])
+        except TimeoutException:
+            print(f"Route '{op['name']}' did not load.")
+            return False
+        if routes is not None:
+            routes.record(driver, op["name"])
+        return True
+    if kind == "network_idle":
+        try:
+            tracker.wait_for_idle(op["idle_ms"], op["timeout"])
+        except TimeoutException as e:
+            print(e.msg)
+            return False
+        return True
+    if kind == "await_response":
+        try:
+            response = tracker.wait_for_response(op["url"], since, op["timeout"])
+        except TimeoutException as e:
+            print(e.msg)
+            return False
+        if response["failed"] or (response["status"] or 0) >= 400:
+            print(f"Request to '{response['url']}' failed ({response['status'] or 'no response'}).")
+            return False
+        return True
+    if kind == "measure":
+        # let a client-side route finish rendering before reading its timings
+        try:
+            wait_for_dom_quiet(driver, 300, op["timeout"])
+        except TimeoutException:
+            pass
+        print_page_metrics(collect_page_metrics(driver, op["label"]))
+        return True
+    raise PlanError(f"Unknown op '{kind}'.")
+
+
+def run_plan(driver, plan_path, interceptor=None):
+    """Loads, compiles and runs a step plan file."""
+    return run_program(driver, compile_plan(load_plan(plan_path)), interceptor)
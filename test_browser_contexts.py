@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from browser_contexts import form_check_flow, run_in_contexts
+from mock_portal import MockPortal
+from result_log import ResultLog
+
+
+def make_driver():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1280,900")
+    return webdriver.Chrome(options=options)
+
+
+class RunInContextsTest(unittest.TestCase):
+    """Runs the appeals plan, whose clicks navigate between pages, through ContextPage."""
+
+    def setUp(self):
+        try:
+            self.driver = make_driver()
+        except WebDriverException as e:
+            self.skipTest(f"Chrome is not available: {e.msg}")
+        self.addCleanup(self.driver.quit)
+        self.portal = MockPortal().start()
+        self.addCleanup(self.portal.stop)
+        results = tempfile.TemporaryDirectory()
+        self.addCleanup(results.cleanup)
+        patcher = mock.patch("check_form_submission.ResultLog", lambda: ResultLog(results.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_navigating_plan(self):
+        flows = [form_check_flow([], url=self.portal.url()) for _ in range(2)]
+
+        self.assertEqual(run_in_contexts(self.driver, flows), [True, True])
+        self.assertEqual(self.portal.hits.get("GET /member/messages"), 2)
+        self.assertEqual(self.portal.submissions, [])
+
+
+if __name__ == "__main__":
+    unittest.main()